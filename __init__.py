@@ -3,28 +3,27 @@ bl_info = {
     "author": "Rotari Artiom",
     "version": (0, 1, 1),
     "blender": (4, 2, 1),
-    "location": "File > Import > Mef Model (.mef) ",
-    "description": "Import IGI2 Mef models",
+    "location": "File > Import-Export > Mef Model (.mef) ",
+    "description": "Import and export IGI2 Mef models",
     "category": "Import-Export",
 }
 
+# Reload support for development, only the modules already loaded are reloaded
+if "bpy" in locals():
+    import importlib
+    for module_name in ("reader_ilff", "struct_mef", "optimize_mef", "import_mef", "watch_mef",
+                        "export_mef", "index_mef", "worker_mef", "validate_mef"):
+        if module_name in locals():
+            importlib.reload(locals()[module_name])
+
+# Decoders, NumPy and the dtype tables are imported by the operators on first
+# use, registration only sets up operators and menus.
 import bpy
-from bpy.props import StringProperty, BoolProperty
-from bpy_extras.io_utils import ImportHelper
+from bpy.props import StringProperty, BoolProperty, IntProperty, FloatProperty, CollectionProperty
+from bpy_extras.io_utils import ImportHelper, ExportHelper
 import os
 import sys
-
-# Add the current directory to sys.path
-addon_dir = os.path.dirname(__file__)
-sys.path.append(addon_dir)
-
-import import_mef
-
-# Reload support for development
-if "bpy" in locals():
-    import importlib
-    if "import_mef" in locals():
-        importlib.reload(import_mef)
+from contextlib import closing
 
 
 class Mef(object):
@@ -50,11 +49,84 @@ class MefImporter(bpy.types.Operator, ImportHelper):
         maxlen=255
     ) # type: ignore
 
+    files: CollectionProperty(
+        type=bpy.types.OperatorFileListElement,
+        options={'HIDDEN', 'SKIP_SAVE'}
+    ) # type: ignore
+
+    directory: StringProperty(
+        subtype='DIR_PATH'
+    ) # type: ignore
+
+    proxy: BoolProperty(
+        name="Bounds Proxy",
+        description="Only read the model header and create a bounds box, full geometry is loaded by Realize Mef Proxies",
+        default=False
+    ) # type: ignore
+
+    weld: BoolProperty(
+        name="Weld Vertices",
+        description="Merge vertices duplicated at UV and normal seams, keeping UVs and normals per face corner",
+        default=False
+    ) # type: ignore
+
+    weld_distance: FloatProperty(
+        name="Weld Distance",
+        description="Vertices closer than this, in model units, are merged",
+        default=0.01,
+        min=0.0
+    ) # type: ignore
+
+    lod_levels: IntProperty(
+        name="LOD Levels",
+        description="Number of decimated alternates to generate per sub-mesh, switched with Set Mef LOD",
+        default=0,
+        min=0,
+        max=4
+    ) # type: ignore
+
+    memory_budget: BoolProperty(
+        name="Low Memory",
+        description="Build one sub-mesh at a time from views of the file data, free it as soon as it is in Blender "
+                    "and print the peak allocation",
+        default=False
+    ) # type: ignore
+
+    validate: BoolProperty(
+        name="Validate",
+        description="Check chunk sizes, header counts and indices first and skip malformed files",
+        default=False
+    ) # type: ignore
+
     def execute(self, context):
         from . import import_mef
 
+        if self.files and self.files[0].name:
+            filepaths = [os.path.join(self.directory, file.name) for file in self.files]
+        else:
+            filepaths = [self.filepath]
+
+        if self.validate:
+            from . import validate_mef
+
+            valid = []
+            for filepath in filepaths:
+                errors = validate_mef.validate(filepath)
+                if errors:
+                    self.report({'WARNING'}, f"Skipping {os.path.basename(filepath)}: {errors[0]}")
+                    for error in errors:
+                        print(f"{filepath}: {error}")
+                else:
+                    valid.append(filepath)
+
+            if not valid:
+                return {'CANCELLED'}
+            filepaths = valid
+
         # Ensure the filepath is a string and passed correctly
-        import_mef.load(self.filepath)
+        for filepath in filepaths:
+            import_mef.load(filepath, proxy=self.proxy, weld_distance=self.weld_distance if self.weld else 0.0,
+                            lod_levels=self.lod_levels, memory_budget=self.memory_budget)
 
         return {'FINISHED'}
 
@@ -63,18 +135,301 @@ class MefImporter(bpy.types.Operator, ImportHelper):
         return {'RUNNING_MODAL'}
 
 
+class MefBackgroundImporter(bpy.types.Operator, ImportHelper):
+    """Load Mef models, decoding them in worker processes while Blender stays responsive"""
+    bl_idname = "import_mef_model.mef_background"
+    bl_label = "Import Mef (Background)"
+    bl_options = {'UNDO'}
+
+    filter_glob: StringProperty(
+        default="*.mef",
+        options={'HIDDEN'},
+        maxlen=255
+    ) # type: ignore
+
+    files: CollectionProperty(
+        type=bpy.types.OperatorFileListElement,
+        options={'HIDDEN', 'SKIP_SAVE'}
+    ) # type: ignore
+
+    directory: StringProperty(
+        subtype='DIR_PATH'
+    ) # type: ignore
+
+    def execute(self, context):
+        if self.files and self.files[0].name:
+            self._queue = [os.path.join(self.directory, file.name) for file in self.files]
+        else:
+            self._queue = [self.filepath]
+
+        self._jobs = []
+        self._done = 0
+        self._total = len(self._queue)
+
+        wm = context.window_manager
+        wm.progress_begin(0, self._total)
+        self._timer = wm.event_timer_add(0.05, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.abort(context)
+            self.report({'WARNING'}, f"Cancelled after {self._done} of {self._total} Mef models")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # Anything escaping modal would leave the timer, the progress bar and
+        # the workers behind.
+        try:
+            return self.step(context)
+        except Exception as e:
+            self.abort(context)
+            self.report({'ERROR'}, f"Stopped after {self._done} of {self._total} Mef models: {type(e).__name__}: {e}")
+            return {'CANCELLED'}
+
+    def step(self, context):
+        from . import import_mef
+        from . import worker_mef
+
+        while self._queue and len(self._jobs) < (os.cpu_count() or 1):
+            self._jobs.append(worker_mef.Job(self._queue.pop(0)))
+
+        for job in [job for job in self._jobs if job.ready()]:
+            self._jobs.remove(job)
+            try:
+                arrays = job.arrays()
+                if arrays is None:
+                    import_mef.load(job.filepath)
+                else:
+                    import_mef.load_arrays(job.filepath, arrays)
+            except Exception as e:
+                # One bad file only costs its own model.
+                self.report({'WARNING'}, f"{job.filepath}: {type(e).__name__}: {e}")
+            finally:
+                arrays = None
+                job.release()
+
+            self._done += 1
+            context.window_manager.progress_update(self._done)
+
+        if not self._queue and not self._jobs:
+            self.finish(context)
+            self.report({'INFO'}, f"Imported {self._done} Mef models")
+            return {'FINISHED'}
+
+        return {'RUNNING_MODAL'}
+
+    def finish(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+
+    def abort(self, context):
+        for job in self._jobs:
+            job.cancel()
+        self._jobs.clear()
+        self._queue.clear()
+        self.finish(context)
+
+
+class MefIndexImporter(bpy.types.Operator):
+    """Import every model of a Mef index matching the given filters"""
+    bl_idname = "import_mef_model.mef_index"
+    bl_label = "Import Mef From Index"
+    bl_options = {'UNDO'}
+
+    index_path: StringProperty(
+        name="Index",
+        description="Model index database built by index_mef.py",
+        subtype='FILE_PATH'
+    ) # type: ignore
+
+    game_dir: StringProperty(
+        name="Game Directory",
+        description="If set, the index is brought up to date with this directory first",
+        subtype='DIR_PATH'
+    ) # type: ignore
+
+    model_type: IntProperty(
+        name="Model Type",
+        description="Only models of this type, -1 for any",
+        default=-1,
+        min=-1
+    ) # type: ignore
+
+    min_faces: IntProperty(
+        name="Min Faces",
+        description="Only models with at least this many render faces",
+        default=0,
+        min=0
+    ) # type: ignore
+
+    texture: StringProperty(
+        name="Texture",
+        description="Only models using this common.dat texture"
+    ) # type: ignore
+
+    proxy: BoolProperty(
+        name="Bounds Proxy",
+        description="Only read the model header and create a bounds box, full geometry is loaded by Realize Mef Proxies",
+        default=True
+    ) # type: ignore
+
+    def execute(self, context):
+        from . import import_mef
+        from . import index_mef
+
+        with closing(index_mef.open_index(bpy.path.abspath(self.index_path))) as connection:
+            if self.game_dir:
+                index_mef.update_index(connection, bpy.path.abspath(self.game_dir))
+
+            filepaths = index_mef.query(connection,
+                                        model_type=self.model_type if self.model_type >= 0 else None,
+                                        min_faces=self.min_faces or None,
+                                        texture=self.texture or None)
+
+        for filepath in filepaths:
+            import_mef.load(filepath, proxy=self.proxy)
+
+        self.report({'INFO'}, f"Imported {len(filepaths)} Mef models")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+
+class MefExporter(bpy.types.Operator, ExportHelper):
+    """Save triangle mesh data, split to 16-bit index ranges and vertex cache optimised"""
+    bl_idname = "export_mef_model.mef"
+    bl_label = "Export Mef"
+
+    filename_ext = ".mef"
+
+    filter_glob: StringProperty(
+        default="*.mef",
+        options={'HIDDEN'},
+        maxlen=255
+    ) # type: ignore
+
+    use_selection: BoolProperty(
+        name="Selected Only",
+        description="Export only the selected mesh objects",
+        default=False
+    ) # type: ignore
+
+    def execute(self, context):
+        from . import export_mef
+
+        return export_mef.save(self, context, self.filepath, use_selection=self.use_selection)
+
+
+class MefRealizeProxies(bpy.types.Operator):
+    """Load the full geometry of the selected Mef bounds proxies"""
+    bl_idname = "object.mef_realize_proxies"
+    bl_label = "Realize Mef Proxies"
+    bl_options = {'UNDO'}
+
+    def execute(self, context):
+        from . import import_mef
+
+        proxies = [obj for obj in context.selected_objects
+                   if obj.type == 'EMPTY' and 'mef_filepath' in obj and not obj.get('mef_realized')]
+
+        for proxy in proxies:
+            import_mef.realize_proxy(proxy)
+
+        self.report({'INFO'}, f"Realized {len(proxies)} Mef proxies")
+        return {'FINISHED'}
+
+
+class MefSetLod(bpy.types.Operator):
+    """Swap the selected Mef objects to one of their generated LOD meshes"""
+    bl_idname = "object.mef_set_lod"
+    bl_label = "Set Mef LOD"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    level: IntProperty(
+        name="Level",
+        description="0 is the full mesh, higher levels are coarser",
+        default=0,
+        min=0
+    ) # type: ignore
+
+    def execute(self, context):
+        for obj in context.selected_objects:
+            lods = obj.get('mef_lods')
+            if lods:
+                mesh = bpy.data.meshes.get(lods[min(self.level, len(lods) - 1)])
+                if mesh is not None:
+                    obj.data = mesh
+        return {'FINISHED'}
+
+
+class MefToggleHotReload(bpy.types.Operator):
+    """Watch imported Mef files and update their meshes in place when they change on disk"""
+    bl_idname = "object.mef_toggle_hot_reload"
+    bl_label = "Toggle Mef Hot Reload"
+
+    def execute(self, context):
+        from . import watch_mef
+
+        if watch_mef.is_running():
+            watch_mef.stop()
+            self.report({'INFO'}, "Mef hot reload stopped")
+        else:
+            watch_mef.start()
+            self.report({'INFO'}, "Mef hot reload started")
+        return {'FINISHED'}
+
+
 def menu_import(self, context):
     self.layout.operator(MefImporter.bl_idname, text="Mef Model (.mef)")
+    self.layout.operator(MefBackgroundImporter.bl_idname, text="Mef Models in Background (.mef)")
+    self.layout.operator(MefIndexImporter.bl_idname, text="Mef Models From Index")
+
+
+def menu_export(self, context):
+    self.layout.operator(MefExporter.bl_idname, text="Mef Model (.mef)")
+
+
+def menu_object(self, context):
+    self.layout.operator(MefRealizeProxies.bl_idname)
+    self.layout.operator(MefSetLod.bl_idname)
+    self.layout.operator(MefToggleHotReload.bl_idname)
 
 
 def register():
     bpy.utils.register_class(MefImporter)
+    bpy.utils.register_class(MefBackgroundImporter)
+    bpy.utils.register_class(MefIndexImporter)
+    bpy.utils.register_class(MefExporter)
+    bpy.utils.register_class(MefRealizeProxies)
+    bpy.utils.register_class(MefSetLod)
+    bpy.utils.register_class(MefToggleHotReload)
     bpy.types.TOPBAR_MT_file_import.append(menu_import)
+    bpy.types.TOPBAR_MT_file_export.append(menu_export)
+    bpy.types.VIEW3D_MT_object.append(menu_object)
 
 
 def unregister():
+    # Only stop the watcher if it was ever loaded, do not import it just for this.
+    watch_mef = sys.modules.get(f"{__name__}.watch_mef")
+    if watch_mef is not None:
+        watch_mef.stop()
+
     bpy.utils.unregister_class(MefImporter)
+    bpy.utils.unregister_class(MefBackgroundImporter)
+    bpy.utils.unregister_class(MefIndexImporter)
+    bpy.utils.unregister_class(MefExporter)
+    bpy.utils.unregister_class(MefRealizeProxies)
+    bpy.utils.unregister_class(MefSetLod)
+    bpy.utils.unregister_class(MefToggleHotReload)
     bpy.types.TOPBAR_MT_file_import.remove(menu_import)
+    bpy.types.TOPBAR_MT_file_export.remove(menu_export)
+    bpy.types.VIEW3D_MT_object.remove(menu_object)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,184 @@
-
-def save_mef(*args, **kwargs):
-    pass
-
-
-def save(*args, **kwargs):
-    save_mef(*args, **kwargs)
-
-    return {'FINISHED'}
-
+import bpy
+import numpy as np
+import struct
+
+from . import optimize_mef
+from .struct_mef import *
+
+FORMAT_SIGNATURE = b'OCEM'
+MODEL_SCALE = 0.0005
+MAX_INDEX = 0xFFFF
+
+
+def write_ilff(filepath, chunks, formatsig=FORMAT_SIGNATURE):
+    """Writes (signature, bytes) chunks as an ILFF file readable by reader_ilff."""
+    body = bytearray()
+    for position, (signature, data) in enumerate(chunks):
+        padding = -len(data) % 4
+        skip = 0 if position == len(chunks) - 1 else 16 + len(data) + padding
+        body += struct.pack('=4s3I', signature, len(data), 4, skip)
+        body += data
+        if skip:
+            body += bytes(padding)
+
+    with open(filepath, 'wb') as file:
+        file.write(struct.pack('=4s3I4s', b'ILFF', 20 + len(body), 4, 0, formatsig))
+        file.write(body)
+
+
+def mesh_arrays(mesh_object, depsgraph):
+    """Returns the unique render vertices and the (a, b, c) triangles of an object in MEF space."""
+    evaluated = mesh_object.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+
+        positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', positions)
+        loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_vertex_indices)
+        loop_normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+        mesh.corner_normals.foreach_get('vector', loop_normals)
+        loop_uvs = np.zeros(len(mesh.loops) * 2, dtype=np.float32)
+        if mesh.uv_layers.active:
+            mesh.uv_layers.active.data.foreach_get('uv', loop_uvs)
+        triangle_loops = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get('loops', triangle_loops)
+    finally:
+        evaluated.to_mesh_clear()
+
+    matrix = np.array(mesh_object.matrix_world, dtype=np.float64)
+    normal_matrix = np.linalg.inv(matrix[:3, :3]).T
+    positions = (positions.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]) / MODEL_SCALE
+    loop_normals = loop_normals.reshape(-1, 3) @ normal_matrix.T
+    loop_normals /= np.maximum(np.linalg.norm(loop_normals, axis=1, keepdims=True), 1e-12)
+    loop_uvs = 1.0 - loop_uvs.reshape(-1, 2)
+
+    # A render vertex is a unique (position, normal, uv) corner.
+    corners = np.column_stack((loop_vertex_indices.astype(np.uint32),
+                               loop_normals.astype(np.float32).view(np.uint32),
+                               loop_uvs.astype(np.float32).view(np.uint32)))
+    _, first, inverse = np.unique(corners, axis=0, return_index=True, return_inverse=True)
+
+    xtrv = np.zeros(len(first), DTYPE_XTRV_0)
+    xtrv['px'], xtrv['py'], xtrv['pz'] = positions[loop_vertex_indices[first]].T
+    xtrv['nx'], xtrv['ny'], xtrv['nz'] = loop_normals[first].T
+    xtrv['u'], xtrv['v'] = loop_uvs[first].T
+
+    # Blender winds (c, b, a) what the importer reads as (a, b, c).
+    triangles = inverse.ravel()[triangle_loops].reshape(-1, 3)[:, ::-1]
+    return xtrv, np.ascontiguousarray(triangles)
+
+
+def split_ranges(triangles):
+    """Splits one object into DNER ranges, returns (range local triangles, range vertices) pairs.
+
+    DNER `num_face` is 16-bit, so a range holds at most MAX_INDEX triangles.
+    Each range gets its own contiguous run of vertices, `off_verts` and
+    `num_verts` describe it.
+    """
+    return [optimize_mef.compact(triangles[start:end])
+            for start, end in optimize_mef.split_ranges(triangles, MAX_INDEX, MAX_INDEX)]
+
+
+def optimize_range(local_triangles, vertices):
+    """Cache optimises one range, returns (triangles, vertices, ACMR before, ACMR after)."""
+    before = optimize_mef.acmr(local_triangles)
+
+    order = optimize_mef.optimize_triangles(local_triangles, len(vertices))
+    local_triangles, remap = optimize_mef.compact(local_triangles[order])
+
+    return local_triangles, vertices[remap], before, optimize_mef.acmr(local_triangles)
+
+
+def save_mef(filepath, objects, depsgraph):
+    """Writes the mesh objects as one type-0 MEF, returns (ACMR before, ACMR after)."""
+    ranges = []
+    for mesh_object in objects:
+        xtrv, triangles = mesh_arrays(mesh_object, depsgraph)
+        ranges.extend((xtrv, local_triangles, vertices) for local_triangles, vertices in split_ranges(triangles))
+
+    if not ranges:
+        raise ValueError("Nothing to export, no triangles found")
+
+    # ECAF indices are 16-bit and address the whole XTRV pool, and DNER
+    # offset_index is 16-bit, so only the last range may start at MAX_INDEX.
+    # Checked before the slow cache optimisation.
+    pool_size = sum(len(vertices) for _, _, vertices in ranges)
+    if pool_size > MAX_INDEX + 1:
+        raise ValueError(f"Model is too large for MEF, {pool_size} vertices. ECAF indices are 16-bit "
+                         f"and address the whole vertex pool, which caps a model at {MAX_INDEX + 1} vertices")
+    range_faces = np.cumsum([len(local_triangles) for _, local_triangles, _ in ranges])
+    if len(ranges) > 1 and range_faces[-2] > MAX_INDEX:
+        raise ValueError(f"Model is too large for MEF, {range_faces[-1]} triangles. DNER offset_index is 16-bit, "
+                         f"which caps a model at about {2 * MAX_INDEX} triangles")
+
+    pools = []
+    faces = []
+    renders = []
+    num_verts = 0
+    num_faces = 0
+    misses_before = 0.0
+    misses_after = 0.0
+
+    for object_xtrv, local_triangles, vertices in ranges:
+        triangles, vertices, before, after = optimize_range(local_triangles, vertices)
+        xtrv = object_xtrv[vertices]
+
+        dner = np.zeros(1, DTYPE_DNER_0)
+        dner['_opacity'] = 255
+        dner['px'], dner['py'], dner['pz'] = (xtrv['px'].mean(), xtrv['py'].mean(), xtrv['pz'].mean())
+        dner['offset_index'] = num_faces
+        dner['num_face'] = len(triangles)
+        dner['off_verts'] = num_verts
+        dner['num_verts'] = len(xtrv)
+
+        ecaf = np.zeros(len(triangles), DTYPE_ECAF)
+        ecaf['a'], ecaf['b'], ecaf['c'] = (triangles + num_verts).T
+
+        pools.append(xtrv)
+        faces.append(ecaf)
+        renders.append(dner)
+        num_verts += len(xtrv)
+        num_faces += len(triangles)
+        misses_before += before * len(triangles)
+        misses_after += after * len(triangles)
+
+    xtrv = np.concatenate(pools)
+    positions = np.column_stack((xtrv['px'], xtrv['py'], xtrv['pz']))
+
+    d3dr = np.zeros(1, DTYPE_D3DR_0)
+    d3dr['_4'] = 4
+    d3dr['num_face'] = num_faces
+    d3dr['num_mesh'] = len(renders)
+    d3dr['num_verts'] = num_verts
+
+    hsem = np.zeros(1, DTYPE_HSEM)
+    hsem['model_type'] = 0
+    hsem['num_r_faces'] = num_faces
+    hsem['num_r_verts'] = num_verts
+    hsem['model_radius'] = np.linalg.norm(positions, axis=1).max()
+
+    write_ilff(filepath, [
+        (b'HSEM', hsem.tobytes()),
+        (b'D3DR', d3dr.tobytes()),
+        (b'DNER', np.concatenate(renders).tobytes()),
+        (b'ECAF', np.concatenate(faces).tobytes()),
+        (b'XTRV', xtrv.tobytes()),
+    ])
+
+    return misses_before / num_faces, misses_after / num_faces
+
+
+def save(operator, context, filepath, use_selection=False):
+    objects = context.selected_objects if use_selection else context.scene.objects
+    objects = [obj for obj in objects if obj.type == 'MESH']
+
+    try:
+        before, after = save_mef(filepath, objects, context.evaluated_depsgraph_get())
+    except ValueError as e:
+        operator.report({'ERROR'}, str(e))
+        return {'CANCELLED'}
+
+    operator.report({'INFO'}, f"Vertex cache ACMR {before:.3f} -> {after:.3f}")
+    return {'FINISHED'}
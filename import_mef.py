@@ -1,18 +1,31 @@
 import bpy
 import numpy as np
-import os
-import sys
+import tracemalloc
 
-addon_dir = os.path.dirname(__file__)
-sys.path.append(addon_dir)
+from . import reader_ilff
+from . import optimize_mef
+from .struct_mef import *
 
-import reader_ilff as reader_ilff
-from struct_mef import *
+LOD_RESOLUTION = 64
+
+def fill_mesh(mesh, positions, triangles):
+    """Writes vertices and triangles into an empty mesh with foreach_set."""
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set('co', np.ascontiguousarray(positions, dtype=np.float32).ravel())
+    mesh.loops.add(triangles.size)
+    mesh.loops.foreach_set('vertex_index', np.ascontiguousarray(triangles, dtype=np.int32).ravel())
+    mesh.polygons.add(len(triangles))
+    mesh.polygons.foreach_set('loop_start', np.arange(0, triangles.size, 3, dtype=np.int32))
+    mesh.update(calc_edges=True)
 
 class Rigid:
-    def __init__(self, reader, objectname):
+    def __init__(self, reader, objectname, weld_distance=0.0, lod_levels=0, memory_budget=False):
         self.reader = reader
         self.objectname = objectname
+        self.weld_distance = weld_distance
+        self.lod_levels = lod_levels
+        self.memory_budget = memory_budget
+        self.peak_memory = None
         self.hsem = None
         self.ecaf = None
         self.d3dr = None
@@ -21,6 +34,11 @@ class Rigid:
         self.xtvc = None
         self.ecfc = None
         self.xtvm = None
+        self.pmtl = None
+        self.lightmap_rects = None
+        self.lightmap_sizes = {}
+        self.lightmap_materials = {}
+        self.render_cache = None
         self.objects = []
 
     def load_bytes(self):
@@ -30,77 +48,192 @@ class Rigid:
         self.dner_bytes = self.reader.read(b'DNER')
         self.ecaf_bytes = self.reader.read(b'ECAF')
         self.xtrv_bytes = self.reader.read(b'XTRV')
-        self.xtvc_bytes = self.reader.read(b'XTVC')
-        self.ecfc_bytes = self.reader.read(b'ECFC')
+        # Collision is not built yet, no need to hold it when memory is tight.
+        self.xtvc_bytes = None if self.memory_budget else self.reader.read(b'XTVC')
+        self.ecfc_bytes = None if self.memory_budget else self.reader.read(b'ECFC')
         self.xtvm_bytes = self.reader.read(b'XTVM')
+        self.pmtl_bytes = self.reader.read(b'PMTL')
 
-        if not all((self.hsem_bytes, self.d3dr_bytes, self.dner_bytes, self.ecaf_bytes, self.xtrv_bytes, self.xtvc_bytes, self.ecfc_bytes, self.xtvm_bytes)):
+        # Collision and magic vertices are optional, exported models only carry render data.
+        if not all((self.hsem_bytes, self.d3dr_bytes, self.dner_bytes, self.ecaf_bytes, self.xtrv_bytes)):
             raise ValueError("One or more required sections are missing from the file.")
 
     def parse_bytes(self):
         """Parses the bytes into NumPy arrays."""
         self.hsem = np.frombuffer(self.hsem_bytes, DTYPE_HSEM)
         self.ecaf = np.frombuffer(self.ecaf_bytes, DTYPE_ECAF)
-        self.ecfc = np.frombuffer(self.ecfc_bytes, DTYPE_ECFC)
-        self.xtvm = np.frombuffer(self.xtvm_bytes, DTYPE_XTVM)
+        if self.ecfc_bytes:
+            self.ecfc = np.frombuffer(self.ecfc_bytes, DTYPE_ECFC)
+        if self.xtvm_bytes:
+            self.xtvm = np.frombuffer(self.xtvm_bytes, DTYPE_XTVM)
 
         model_type = self.hsem['model_type'][0]
         if model_type == 0:
             self.d3dr = np.frombuffer(self.d3dr_bytes, DTYPE_D3DR_0)
             self.dner = np.frombuffer(self.dner_bytes, DTYPE_DNER_0)
             self.xtrv = np.frombuffer(self.xtrv_bytes, DTYPE_XTRV_0)
-            self.xtvc = np.frombuffer(self.xtvc_bytes, DTYPE_XTVC_0)
+            self.xtvc = parse_xtvc(self.xtvc_bytes, model_type) if self.xtvc_bytes else None
         elif model_type == 1:
             self.d3dr = np.frombuffer(self.d3dr_bytes, DTYPE_D3DR_1)
-            self.dner = np.frombuffer(self.dner_bytes, DTYPE_DNER_1)
+            self.dner = parse_dner(self.dner_bytes, model_type)
             self.xtrv = np.frombuffer(self.xtrv_bytes, DTYPE_XTRV_1)
-            self.xtvc = np.frombuffer(self.xtvc_bytes, DTYPE_XTVC_1)
+            self.xtvc = parse_xtvc(self.xtvc_bytes, model_type) if self.xtvc_bytes else None
         elif model_type == 3:
             self.d3dr = np.frombuffer(self.d3dr_bytes, DTYPE_D3DR_3)
             self.dner = np.frombuffer(self.dner_bytes, DTYPE_DNER_3)
             self.xtrv = np.frombuffer(self.xtrv_bytes, DTYPE_XTRV_3)
-            self.xtvc = np.frombuffer(self.xtvc_bytes, DTYPE_XTVC_3)
+            self.xtvc = parse_xtvc(self.xtvc_bytes, model_type) if self.xtvc_bytes else None
+            if self.pmtl_bytes:
+                self.pmtl = np.frombuffer(self.pmtl_bytes, DTYPE_PMTL)
+                self.lightmap_rects, self.lightmap_sizes = lightmap_rects(self.dner, self.pmtl)
+
+    def render_arrays(self):
+        """Returns the vertex positions, normals (None when absent) and per sub-mesh triangles."""
+        vertex_positions = np.column_stack((self.xtrv['px'], self.xtrv['py'], self.xtrv['pz']))
+        vertex_normals = None
+        if 'nx' in self.xtrv.dtype.names:
+            vertex_normals = np.column_stack((self.xtrv['nx'], self.xtrv['ny'], self.xtrv['nz']))
+
+        return vertex_positions, vertex_normals, render_triangles(self.ecaf, self.dner)
+
+    def submesh_arrays(self, object_index):
+        """Returns the vertex positions, normals, triangles and XTRV indices of one sub-mesh.
+
+        Sub-meshes index the whole XTRV pool (the XTRV indices are None), in
+        the memory budget mode only the vertices they use are gathered and
+        the triangles are compacted to them.
+        """
+        if not self.memory_budget:
+            if self.render_cache is None:
+                self.render_cache = self.render_arrays()
+            vertex_positions, vertex_normals, triangles_per_object = self.render_cache
+            return vertex_positions, vertex_normals, triangles_per_object[object_index], None
+
+        face_start = int(self.dner['num_face'][:object_index].sum())
+        object_triangle_indices, vertex_indices = optimize_mef.compact(
+            range_triangles(self.ecaf, face_start, int(self.dner['num_face'][object_index])))
+
+        vertices = self.xtrv[vertex_indices]
+        vertex_positions = np.column_stack((vertices['px'], vertices['py'], vertices['pz']))
+        vertex_normals = None
+        if 'nx' in self.xtrv.dtype.names:
+            vertex_normals = np.column_stack((vertices['nx'], vertices['ny'], vertices['nz']))
+        return vertex_positions, vertex_normals, object_triangle_indices, vertex_indices
+
+    def build_mesh(self, mesh, object_index, vertex_positions, vertex_normals, object_triangle_indices, vertex_indices=None):
+        """Fills an empty mesh with the geometry and UV maps of one sub-mesh.
+
+        `vertex_indices` maps the given vertices back to XTRV when they are a
+        subset of the pool, as in the memory budget mode.
+        """
+        if self.weld_distance > 0.0:
+            self.build_welded_mesh(mesh, object_index, vertex_positions, vertex_normals, object_triangle_indices, vertex_indices)
+            return
+
+        fill_mesh(mesh, vertex_positions, object_triangle_indices)
+
+        if vertex_normals is not None:
+            if len(vertex_normals) == len(mesh.vertices):
+                mesh.normals_split_custom_set_from_vertices(vertex_normals.tolist())
+            else:
+                raise RuntimeError("Number of vertex normals does not match the number of vertices.")
 
-    def create_render(self):
-        """Creates Render objects from the parsed data."""
-        vertex_positions = self.xtrv[['px', 'py', 'pz']].tolist()
-        vertex_normals = self.xtrv[['nx', 'ny', 'nz']].tolist()
-        triangle_indices = self.ecaf[['c', 'b', 'a']]
-        faces_per_object = self.dner['num_face'].tolist()
+        self.apply_uv_maps(mesh, object_index, object_triangle_indices.ravel(), vertex_indices)
 
-        face_start = 0
+        mesh.validate()
 
-        for object_index, num_faces in enumerate(faces_per_object):
-            face_end = face_start + num_faces
-            object_triangle_indices = triangle_indices[face_start:face_end].tolist()
+    def build_welded_mesh(self, mesh, object_index, vertex_positions, vertex_normals, object_triangle_indices, vertex_indices=None):
+        """Like build_mesh, but merges the UV and normal seam duplicates of the XTRV pool.
 
-            object_name = f"{self.objectname}_{object_index}"
-            mesh = bpy.data.meshes.new(object_name)
+        Vertices sharing a position are collapsed, normals and UVs are kept per
+        loop so the result looks the same.
+        """
+        positions, welded_triangles, kept = optimize_mef.weld(vertex_positions, object_triangle_indices, self.weld_distance)
+        loop_vertex_indices = object_triangle_indices[kept].ravel()
 
-            if not isinstance(object_triangle_indices[0], (list, tuple)):
-                raise ValueError("Triangle indices are not in the correct format.")
+        fill_mesh(mesh, positions, welded_triangles[kept])
 
-            mesh.from_pydata(vertex_positions, [], object_triangle_indices)
+        if vertex_normals is not None:
+            mesh.normals_split_custom_set(vertex_normals[loop_vertex_indices].tolist())
 
-            if len(vertex_normals) == len(mesh.vertices):
-                mesh.normals_split_custom_set_from_vertices(vertex_normals)
-            else:
-                raise RuntimeError("Number of vertex normals does not match the number of vertices.")
+        self.apply_uv_maps(mesh, object_index, loop_vertex_indices, vertex_indices)
+
+        mesh.validate()
+
+    def create_render_object(self, object_index, vertex_positions, vertex_normals, object_triangle_indices, vertex_indices=None):
+        """Creates the Render object of one sub-mesh."""
+        object_name = f"{self.objectname}_{object_index}"
+        mesh = bpy.data.meshes.new(object_name)
+
+        self.build_mesh(mesh, object_index, vertex_positions, vertex_normals, object_triangle_indices, vertex_indices)
+        self.apply_lightmap(mesh, object_index)
+
+        mesh_object = bpy.data.objects.new(object_name, mesh)
+        bpy.context.collection.objects.link(mesh_object)     
+
+        mesh_object['mef_submesh'] = object_index
+        if self.weld_distance > 0.0:
+            mesh_object['mef_weld_distance'] = self.weld_distance
+        if self.memory_budget:
+            mesh_object['mef_memory_budget'] = True
+        if self.lod_levels > 0:
+            mesh_object['mef_lod_levels'] = self.lod_levels
+            lods = self.create_lods(object_name, object_index, vertex_positions, object_triangle_indices, vertex_indices)
+            mesh_object['mef_lods'] = [mesh.name] + [lod.name for lod in lods]
+        self.objects.append(mesh_object)
+        
+        mesh_object.scale = (0.0005, 0.0005, 0.0005)
+
+    def create_render(self):
+        """Creates Render objects from the parsed data."""
+        for object_index in range(len(self.dner)):
+            self.create_render_object(object_index, *self.submesh_arrays(object_index))
+        self.render_cache = None
+
+    def create_render_budgeted(self):
+        """Creates Render objects one sub-mesh at a time for the memory budget mode.
 
-            self.apply_uv_maps(mesh)
+        Only the XTRV vertices a sub-mesh uses are gathered from views of the
+        chunk bytes, so neither the whole pool nor all sub-meshes are ever
+        materialised at once. The chunk bytes are dropped when done.
+        """
+        self.create_render()
 
-            mesh.update()
+        self.xtrv = self.ecaf = None
+        self.xtrv_bytes = self.ecaf_bytes = None
+
+    def create_lods(self, object_name, object_index, vertex_positions, object_triangle_indices, vertex_indices=None):
+        """Creates decimated alternates of one sub-mesh by grid vertex clustering.
+
+        Level n uses a grid of LOD_RESOLUTION / 2**(n-1) cells across the
+        sub-mesh's largest extent. The meshes are kept with a fake user and
+        swapped in by the Set Mef LOD operator.
+        """
+        lods = []
+        if not len(object_triangle_indices):
+            return lods
+
+        used_positions = vertex_positions[np.unique(object_triangle_indices)]
+        extent = float((used_positions.max(axis=0) - used_positions.min(axis=0)).max())
+        if extent <= 0.0:
+            return lods
+
+        for level in range(1, self.lod_levels + 1):
+            cell_size = extent / max(LOD_RESOLUTION >> (level - 1), 1)
+            positions, clustered_triangles, kept = optimize_mef.cluster(vertex_positions, object_triangle_indices, cell_size)
+            lod_triangles, used = optimize_mef.compact(clustered_triangles[kept])
+
+            mesh = bpy.data.meshes.new(f"{object_name}_lod{level}")
+            fill_mesh(mesh, positions[used], lod_triangles)
+            self.apply_uv_maps(mesh, object_index, object_triangle_indices[kept].ravel(), vertex_indices)
+            self.apply_lightmap(mesh, object_index)
             mesh.validate()
 
-            mesh_object = bpy.data.objects.new(object_name, mesh)
-            bpy.context.collection.objects.link(mesh_object)     
+            mesh.use_fake_user = True
+            lods.append(mesh)
 
-            self.objects.append(mesh_object)
+        return lods
 
-            face_start = face_end
-            
-            mesh_object.scale = (0.0005, 0.0005, 0.0005)
-                    
     def create_collision(self):
         """Creates Collision mesh object from the parsed data."""
         vertex_positions = self.xtvc[['px', 'py', 'pz']].tolist()
@@ -125,6 +258,9 @@ class Rigid:
      
     def create_magic(self):
         """Creates Magic verts."""
+        if self.xtvm is None:
+            return
+
         vertex_positions = self.xtvm[['px', 'py', 'pz']].tolist()
 
         mesh = bpy.data.meshes.new("magic_mesh")
@@ -145,38 +281,110 @@ class Rigid:
         mesh_object.scale = (0.0005, 0.0005, 0.0005)  
             
 
-    def apply_uv_maps(self, mesh):
-        """Applies UV maps to the mesh."""
-        primary_uv_coordinates = self.xtrv[['u', 'v']].tolist()
-        secondary_uv_coordinates = []
-        if 'u1' in self.xtrv.dtype.names and 'v1' in self.xtrv.dtype.names:
-            secondary_uv_coordinates = self.xtrv[['u1', 'v1']].tolist()
+    def apply_uv_maps(self, mesh, object_index, loop_vertex_indices=None, vertex_indices=None):
+        """Applies UV maps to the mesh, looked up by XTRV index per loop."""
+        if loop_vertex_indices is None:
+            loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get('vertex_index', loop_vertex_indices)
+        if vertex_indices is not None:
+            loop_vertex_indices = vertex_indices[loop_vertex_indices]
 
-        flipped_primary_uv_coordinates = [(1.0 - u, 1.0 - v) for u, v in primary_uv_coordinates]
-        flipped_secondary_uv_coordinates = [(1.0 - u1, 1.0 - v1) for u1, v1 in secondary_uv_coordinates]
+        loop_vertices = self.xtrv[loop_vertex_indices]
+        primary_uv_coordinates = np.column_stack((loop_vertices['u'], loop_vertices['v']))
 
         if not mesh.uv_layers:
             mesh.uv_layers.new(name="PrimaryUVMap")
 
-        primary_uv_layer = mesh.uv_layers.active.data
-        for i, loop in enumerate(mesh.loops):
-            primary_uv_layer[i].uv = flipped_primary_uv_coordinates[loop.vertex_index]
+        mesh.uv_layers.active.data.foreach_set('uv', (1.0 - primary_uv_coordinates).ravel())
+
+        if 'u1' in self.xtrv.dtype.names and 'v1' in self.xtrv.dtype.names:
+            secondary_uv_coordinates = np.column_stack((loop_vertices['u1'], loop_vertices['v1']))
+
+            if self.lightmap_rects is not None:
+                rect = self.lightmap_rects[object_index]
+                secondary_uv_coordinates = rect[:2] + secondary_uv_coordinates * rect[2:]
+
+            secondary_uv_layer = mesh.uv_layers.get("SecondaryUVMap") or mesh.uv_layers.new(name="SecondaryUVMap")
+            secondary_uv_layer.data.foreach_set('uv', (1.0 - secondary_uv_coordinates).ravel())
+
+    def apply_lightmap(self, mesh, object_index):
+        """Assigns the lightmap material shared by every sub-mesh on the same page."""
+        if self.lightmap_rects is None:
+            return
+
+        page = int(self.dner['_lmap'][object_index])
+        if page < 0:
+            return
+
+        material = self.lightmap_materials.get(page)
+        if material is None:
+            material = create_lightmap_material(f"{self.objectname}_lightmap_{page}", *self.lightmap_sizes[page])
+            self.lightmap_materials[page] = material
 
-        if len(flipped_secondary_uv_coordinates) > 0:
-            secondary_uv_layer = mesh.uv_layers.new(name="SecondaryUVMap")
-            for i, loop in enumerate(mesh.loops):
-                secondary_uv_layer.data[i].uv = flipped_secondary_uv_coordinates[loop.vertex_index]
+        mesh.materials.append(material)
 
     def load(self):
         """Main method to load and create the mesh."""
+        if self.memory_budget:
+            return self.load_budgeted()
+
         self.load_bytes()
         self.parse_bytes()
         self.create_render()
         #self.create_collision()
         self.create_magic()
-        self.create_spheres()           
         return self.objects
 
+    def load_budgeted(self):
+        """Loads in the memory budget mode and reports the peak Python side allocation.
+
+        The peak is only measured when tracemalloc is started here, an already
+        running trace keeps its own peak and only the net change is reported.
+        """
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+
+        try:
+            self.load_bytes()
+            self.parse_bytes()
+            self.create_render_budgeted()
+            self.create_magic()
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            if started:
+                self.peak_memory = peak
+                tracemalloc.stop()
+
+        if started:
+            print(f"{self.objectname}: peak allocation {self.peak_memory / 2**20:.1f} MiB")
+        else:
+            print(f"{self.objectname}: net allocation {(current - before) / 2**20:.1f} MiB, "
+                  f"peak not measured while tracemalloc is already tracing")
+        return self.objects
+
+def create_lightmap_material(name, width, height):
+    """Creates the lightmap image and material for one lightmap page."""
+    image = bpy.data.images.new(name, width, height)
+
+    material = bpy.data.materials.new(name)
+    material.use_nodes = True
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+
+    uv_node = nodes.new('ShaderNodeUVMap')
+    uv_node.uv_map = "SecondaryUVMap"
+
+    image_node = nodes.new('ShaderNodeTexImage')
+    image_node.image = image
+    nodes.active = image_node
+
+    links.new(uv_node.outputs['UV'], image_node.inputs['Vector'])
+    links.new(image_node.outputs['Color'], nodes['Principled BSDF'].inputs['Base Color'])
+
+    return material
+
 class Shadow:
     def __init__(self, reader, objectname):
         self.reader = reader
@@ -236,13 +444,130 @@ def load_mef(*args, **kwargs):
     name = bpy.path.display_name_from_filepath(args[0])
     reader = reader_ilff.open_ilff(str(args[0]))
     
+    objects = []
     if reader.find(b'HSEM'):
-        rigidLoader = Rigid(reader, name)
-        rigidLoader.load()
+        rigidLoader = Rigid(reader, name, weld_distance=kwargs.get('weld_distance', 0.0),
+                            lod_levels=kwargs.get('lod_levels', 0), memory_budget=kwargs.get('memory_budget', False))
+        objects = rigidLoader.load()
     elif reader.find(b'SEMS'):
         shadowLoader = Shadow(reader, name)
-        shadowLoader.load()
+        objects = shadowLoader.load()
+
+    for obj in objects:
+        obj['mef_filepath'] = str(args[0])
+    return objects
+
+def load_arrays(filepath, arrays):
+    """Builds the render and magic objects of a model decoded by worker_mef.
+
+    Everything is written with foreach_set straight from the arrays, which may
+    be views into shared memory and are not kept after this returns.
+    """
+    name = bpy.path.display_name_from_filepath(filepath)
+    positions = arrays['positions']
+    face_ends = np.cumsum(arrays['num_face'])
+    face_starts = face_ends - arrays['num_face']
+
+    lightmap_materials = {}
+    if 'lightmap_sizes' in arrays:
+        for page, width, height in arrays['lightmap_sizes'].tolist():
+            lightmap_materials[page] = create_lightmap_material(f"{name}_lightmap_{page}", width, height)
+
+    objects = []
+    for object_index, (face_start, face_end) in enumerate(zip(face_starts.tolist(), face_ends.tolist())):
+        object_name = f"{name}_{object_index}"
+        mesh = bpy.data.meshes.new(object_name)
+        loops = slice(face_start * 3, face_end * 3)
+
+        fill_mesh(mesh, positions, arrays['loops'][loops].reshape(-1, 3))
+
+        if 'normals' in arrays:
+            mesh.normals_split_custom_set_from_vertices(arrays['normals'].tolist())
+
+        mesh.uv_layers.new(name="PrimaryUVMap").data.foreach_set('uv', arrays['uv'][loops].ravel())
+        if 'uv1' in arrays:
+            mesh.uv_layers.new(name="SecondaryUVMap").data.foreach_set('uv', arrays['uv1'][loops].ravel())
+
+        page = int(arrays['lightmap_pages'][object_index]) if 'lightmap_pages' in arrays else -1
+        if page in lightmap_materials:
+            mesh.materials.append(lightmap_materials[page])
+
+        mesh.validate()
+
+        mesh_object = bpy.data.objects.new(object_name, mesh)
+        bpy.context.collection.objects.link(mesh_object)
+        mesh_object['mef_filepath'] = str(filepath)
+        mesh_object['mef_submesh'] = object_index
+        mesh_object.scale = (0.0005, 0.0005, 0.0005)
+        objects.append(mesh_object)
+
+    if not len(arrays['magic']):
+        return objects
+
+    mesh = bpy.data.meshes.new("magic_mesh")
+    mesh.vertices.add(len(arrays['magic']))
+    mesh.vertices.foreach_set('co', arrays['magic'].ravel())
+    mesh.update()
+
+    mesh_object = bpy.data.objects.new(f"{name}_magic", mesh)
+    bpy.context.collection.objects.link(mesh_object)
+    mesh_object.scale = (0.0005, 0.0005, 0.0005)
+
+    return objects
+
+# Import options kept on a proxy so that realizing it builds the same geometry.
+PROXY_OPTIONS = ('weld_distance', 'lod_levels', 'memory_budget')
+
+def load_proxy(filepath, **kwargs):
+    """Creates a bounds empty for a MEF from its ILFF directory and HSEM chunk only.
+
+    The full geometry is decoded later by `realize_proxy` with the same
+    options. Files without HSEM (shadow models) have no cheap extent, so they
+    are loaded right away.
+
+    The box is a cube of half-size `model_radius` around the model origin.
+    The radius is measured from the origin, so the box always encloses the
+    model. The HSEM `vectors` block is not used: its twelve floats have no
+    known layout, nothing else reads them and exported models leave them
+    zeroed, so any bounds taken from them would be a guess.
+    """
+    name = bpy.path.display_name_from_filepath(filepath)
+
+    with reader_ilff.open_ilff(str(filepath)) as reader:
+        hsem_bytes = reader.read(b'HSEM')
+
+    if not hsem_bytes:
+        return load_mef(filepath, **kwargs)
+
+    hsem = parse_hsem(hsem_bytes)
+
+    proxy = bpy.data.objects.new(f"{name}_proxy", None)
+    proxy.empty_display_type = 'CUBE'
+    proxy.empty_display_size = float(hsem['model_radius'][0]) * 0.0005
+    proxy['mef_filepath'] = str(filepath)
+    for option in PROXY_OPTIONS:
+        if option in kwargs:
+            proxy[f'mef_{option}'] = kwargs[option]
+    bpy.context.collection.objects.link(proxy)
+
+    return [proxy]
+
+def realize_proxy(proxy):
+    """Decodes the full model behind a proxy and parents it to the proxy."""
+    existing = set(bpy.data.objects)
+
+    options = {option: proxy[f'mef_{option}'] for option in PROXY_OPTIONS if f'mef_{option}' in proxy}
+    load_mef(proxy['mef_filepath'], **options)
+
+    for obj in set(bpy.data.objects) - existing:
+        obj.parent = proxy
+
+    proxy.empty_display_type = 'PLAIN_AXES'
+    proxy['mef_realized'] = True
 
-def load(*args, **kwargs):
-    load_mef(*args, **kwargs)
+def load(*args, proxy=False, **kwargs):
+    if proxy:
+        load_proxy(*args, **kwargs)
+    else:
+        load_mef(*args, **kwargs)
     return {'FINISHED'}
\ No newline at end of file
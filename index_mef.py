@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import argparse
+from contextlib import closing
+
+addon_dir = os.path.dirname(__file__)
+
+# Also run as a plain script, outside Blender and the add-on package.
+if __package__:
+    from . import reader_ilff
+    from .struct_mef import parse_hsem
+else:
+    import reader_ilff
+    from struct_mef import parse_hsem
+
+HSEM_FIELDS = ('model_type', 'num_r_faces', 'num_r_verts', 'sum_c_faces', 'sum_c_verts',
+               'model_radius', 'num_attachments', 'num_portals', 'num_bones', 'num_glows')
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS models (
+    path  TEXT PRIMARY KEY,
+    name  TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size  INTEGER NOT NULL,
+    {', '.join(f'{field} {"REAL" if field == "model_radius" else "INTEGER"}' for field in HSEM_FIELDS)}
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    path      TEXT NOT NULL REFERENCES models(path) ON DELETE CASCADE,
+    position  INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    size      INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS textures (
+    name    TEXT NOT NULL,
+    texture TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS chunks_path ON chunks(path);
+CREATE INDEX IF NOT EXISTS textures_name ON textures(name);
+CREATE INDEX IF NOT EXISTS textures_texture ON textures(texture);
+"""
+
+
+def read_common_dat(filepath):
+    """Reads the model name -> texture names table from common.dat."""
+    with open(filepath, 'r') as file:
+        lines = [line.strip() for line in file if line.strip() and not line.startswith('***')]
+
+    textures = {}
+    count = int(lines[0])
+    pos = 1
+    for _ in range(count):
+        name, num = lines[pos], int(lines[pos + 1])
+        textures[name.lower()] = [texture.lower() for texture in lines[pos + 2:pos + 2 + num]]
+        pos += 2 + num
+    return textures
+
+
+def open_index(db_path):
+    """Opens (and creates if needed) the model index database."""
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def scan_model(filepath):
+    """Reads the chunk table and HSEM counters of a single model."""
+    with reader_ilff.open_ilff(filepath) as reader:
+        chunks = [(position, info.signature.decode('latin-1'), info.size) for position, info in enumerate(reader.chunks())]
+        hsem_bytes = reader.read(b'HSEM')
+
+    counts = dict.fromkeys(HSEM_FIELDS)
+    if hsem_bytes:
+        hsem = parse_hsem(hsem_bytes)
+        counts = {field: hsem[field][0].item() for field in HSEM_FIELDS}
+    return chunks, counts
+
+
+def update_textures(connection, common_path):
+    """Reloads the texture table when common.dat changed since the last update."""
+    mtime = str(os.path.getmtime(common_path))
+    row = connection.execute("SELECT value FROM meta WHERE key = 'common_mtime'").fetchone()
+    if row and row[0] == mtime:
+        return
+
+    connection.execute("DELETE FROM textures")
+    connection.executemany("INSERT INTO textures VALUES (?, ?)",
+                           ((name, texture) for name, textures in read_common_dat(common_path).items() for texture in textures))
+    connection.execute("INSERT OR REPLACE INTO meta VALUES ('common_mtime', ?)", (mtime,))
+
+
+def update_index(connection, root, common_path=None):
+    """Brings the index up to date with the models under `root`.
+
+    Paths are stored absolute and normalised, so one index can hold several
+    game directories. Only files whose mtime or size changed since the last
+    run are opened. Models under `root` that are gone or can no longer be
+    read are dropped, models elsewhere are left alone. Returns the number of
+    (re)scanned and removed models.
+    """
+    root = os.path.normpath(os.path.abspath(root))
+    if common_path is None:
+        common_path = os.path.join(root, 'common.dat')
+        if not os.path.exists(common_path):
+            common_path = os.path.join(addon_dir, 'common.dat')
+    if os.path.exists(common_path):
+        update_textures(connection, common_path)
+
+    prefix = os.path.join(root, '')
+    known = {path: (mtime, size) for path, mtime, size in connection.execute("SELECT path, mtime, size FROM models")
+             if path.startswith(prefix)}
+    found = set()
+    scanned = 0
+
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.lower().endswith('.mef'):
+                continue
+
+            filepath = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(filepath)
+                if known.get(filepath) == (stat.st_mtime, stat.st_size):
+                    found.add(filepath)
+                    continue
+                chunks, counts = scan_model(filepath)
+            except (OSError, ValueError) as e:
+                # Left out of `found`, so a stale row of this file is removed below.
+                print(f"Skipping {filepath}: {e}")
+                continue
+
+            found.add(filepath)
+
+            connection.execute("DELETE FROM models WHERE path = ?", (filepath,))
+            connection.execute(f"INSERT INTO models VALUES (?, ?, ?, ?, {', '.join('?' * len(HSEM_FIELDS))})",
+                               (filepath, os.path.splitext(filename)[0].lower(), stat.st_mtime, stat.st_size,
+                                *(counts[field] for field in HSEM_FIELDS)))
+            connection.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)",
+                                   ((filepath, *chunk) for chunk in chunks))
+            scanned += 1
+
+    removed = set(known) - found
+    connection.executemany("DELETE FROM models WHERE path = ?", ((path,) for path in removed))
+    connection.commit()
+
+    return scanned, len(removed)
+
+
+def query(connection, model_type=None, min_faces=None, max_faces=None, texture=None, chunk=None):
+    """Returns the paths of the indexed models matching every given filter."""
+    clauses = []
+    params = []
+
+    if model_type is not None:
+        clauses.append("model_type = ?")
+        params.append(model_type)
+    if min_faces is not None:
+        clauses.append("num_r_faces >= ?")
+        params.append(min_faces)
+    if max_faces is not None:
+        clauses.append("num_r_faces <= ?")
+        params.append(max_faces)
+    if texture:
+        clauses.append("name IN (SELECT name FROM textures WHERE texture = ?)")
+        params.append(texture.lower())
+    if chunk:
+        clauses.append("path IN (SELECT path FROM chunks WHERE signature = ?)")
+        params.append(chunk)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return [row[0] for row in connection.execute(f"SELECT path FROM models {where} ORDER BY path", params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and query a directory of MEF models.")
+    parser.add_argument('root', help="Game directory to index")
+    parser.add_argument('--db', default='mef_index.sqlite', help="Index database path")
+    parser.add_argument('--type', type=int, dest='model_type', help="Only models of this model_type")
+    parser.add_argument('--min-faces', type=int, help="Only models with at least this many render faces")
+    parser.add_argument('--max-faces', type=int, help="Only models with at most this many render faces")
+    parser.add_argument('--texture', help="Only models using this common.dat texture")
+    parser.add_argument('--chunk', help="Only models containing this chunk signature")
+    args = parser.parse_args()
+
+    with closing(open_index(args.db)) as connection:
+        scanned, removed = update_index(connection, args.root)
+        print(f"Scanned {scanned}, removed {removed}")
+
+        for path in query(connection, args.model_type, args.min_faces, args.max_faces, args.texture, args.chunk):
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
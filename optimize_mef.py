@@ -0,0 +1,206 @@
+import numpy as np
+
+# Forsyth, "Linear-Speed Vertex Cache Optimisation".
+CACHE_SIZE = 32
+CACHE_DECAY_POWER = 1.5
+LAST_TRI_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+# Post-transform cache used to measure the result, a small FIFO like the hardware has.
+ACMR_CACHE_SIZE = 16
+
+
+def split_ranges(triangles, limit=0xFFFF + 1, max_triangles=None):
+    """Splits a triangle list into consecutive runs that each use at most `limit` vertices.
+
+    Returns a list of (start, end) triangle ranges. Each run is as long as
+    possible, counted from the first occurrences of its corner indices, and
+    holds at most `max_triangles` triangles if given.
+    """
+    ranges = []
+    start = 0
+    while start < len(triangles):
+        corners = triangles[start:].ravel()
+        _, first = np.unique(corners, return_index=True)
+        is_first = np.zeros(len(corners), dtype=bool)
+        is_first[first] = True
+
+        # Distinct vertices used by the first n triangles of the run.
+        used = np.cumsum(is_first)[2::3]
+        count = int(np.searchsorted(used, limit, side='right'))
+        if max_triangles is not None:
+            count = min(count, max_triangles)
+        ranges.append((start, start + count))
+        start += count
+    return ranges
+
+
+def compact(triangles):
+    """Renumbers the vertices of a triangle list in order of first use.
+
+    Returns the new triangles and, for every new vertex, its old index.
+    """
+    corners = triangles.ravel()
+    _, first, inverse = np.unique(corners, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inverse].reshape(triangles.shape), corners[first[order]]
+
+
+def weld(positions, triangles, distance):
+    """Collapses the corners of a triangle list whose positions share a `distance` sized grid cell.
+
+    Returns the welded positions (one original position per cell, unused
+    vertices dropped), the welded triangles and a mask of the triangles that
+    did not collapse to a line or point.
+    """
+    corners = triangles.ravel()
+    cells = np.ascontiguousarray(np.round(positions[corners] / distance).astype(np.int64))
+    keys = cells.view(np.dtype((np.void, cells.dtype.itemsize * 3))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    welded = inverse.reshape(triangles.shape)
+    kept = (welded[:, 0] != welded[:, 1]) & (welded[:, 1] != welded[:, 2]) & (welded[:, 2] != welded[:, 0])
+    return positions[corners[first]], welded, kept
+
+
+def cluster(positions, triangles, cell_size):
+    """Simplifies a triangle list by grid vertex clustering.
+
+    Every used vertex is snapped to the mean of its `cell_size` grid cell.
+    Returns the cluster positions, the clustered triangles and a mask of the
+    triangles that neither collapsed nor duplicate an earlier one.
+    """
+    corners = triangles.ravel()
+    used, inverse = np.unique(corners, return_inverse=True)
+    used_positions = positions[used].astype(np.float64)
+
+    cells = np.ascontiguousarray(np.floor(used_positions / cell_size).astype(np.int64))
+    keys = cells.view(np.dtype((np.void, cells.dtype.itemsize * 3))).ravel()
+    _, cluster_of = np.unique(keys, return_inverse=True)
+    cluster_of = cluster_of.ravel()
+
+    counts = np.bincount(cluster_of)
+    centers = np.column_stack([np.bincount(cluster_of, weights=used_positions[:, axis]) for axis in range(3)]) / counts[:, None]
+
+    clustered = cluster_of[inverse.ravel()].reshape(triangles.shape)
+    kept = (clustered[:, 0] != clustered[:, 1]) & (clustered[:, 1] != clustered[:, 2]) & (clustered[:, 2] != clustered[:, 0])
+
+    candidates = np.flatnonzero(kept)
+    sorted_triangles = np.ascontiguousarray(np.sort(clustered[candidates], axis=1))
+    _, first = np.unique(sorted_triangles.view(np.dtype((np.void, sorted_triangles.dtype.itemsize * 3))).ravel(),
+                         return_index=True)
+    kept[:] = False
+    kept[candidates[first]] = True
+
+    return centers.astype(np.float32), clustered, kept
+
+
+def _score_tables(max_valence):
+    """Vertex score terms by cache position + 1 (0 when not cached) and by remaining valence.
+
+    A vertex without remaining triangles scores as if it had one, only
+    triangles that were already emitted contain it.
+    """
+    position = np.arange(-1, CACHE_SIZE)
+    position_score = np.where(position < 3, LAST_TRI_SCORE,
+                              (1.0 - (position - 3) / (CACHE_SIZE - 3)) ** CACHE_DECAY_POWER)
+    position_score[0] = 0.0
+    valence_score = VALENCE_BOOST_SCALE * np.power(np.maximum(np.arange(max_valence + 1), 1), -VALENCE_BOOST_POWER)
+    return position_score, valence_score
+
+
+def optimize_triangles(triangles, num_verts=None):
+    """Reorders triangles for the post-transform vertex cache with Forsyth's algorithm.
+
+    Returns the order in which the triangles should be drawn. Picking stays a
+    Python loop, one step per triangle, at roughly 35 us a step, so a full
+    65,535 triangle DNER range takes about 2 s.
+    """
+    num_tris = len(triangles)
+    if num_verts is None:
+        num_verts = int(triangles.max()) + 1 if num_tris else 0
+
+    order = np.empty(num_tris, dtype=np.int64)
+    if not num_tris:
+        return order
+
+    triangles = np.asarray(triangles, dtype=np.int64)
+    corners = triangles.ravel()
+    valence = np.bincount(corners, minlength=num_verts)
+
+    # CSR adjacency, the triangles around vertex v are vertex_tris[vertex_start[v]:vertex_start[v + 1]].
+    vertex_tris = np.argsort(corners, kind='stable') // 3
+    vertex_start = np.concatenate(([0], np.cumsum(valence)))
+
+    position_score, valence_score = _score_tables(int(valence.max()))
+    cache_position = np.full(num_verts, -1, dtype=np.int64)
+    vertex_score = position_score[cache_position + 1] + valence_score[valence]
+    tri_score = vertex_score[triangles].sum(axis=1)
+    emitted = np.zeros(num_tris, dtype=bool)
+
+    # Fixed size cache, most recent first, with -1 in the unused slots.
+    cache = np.full(CACHE_SIZE, -1, dtype=np.int64)
+    slots = np.arange(CACHE_SIZE)
+    best = int(np.argmax(tri_score))
+
+    for step in range(num_tris):
+        order[step] = best
+        emitted[best] = True
+        tri_score[best] = -np.inf
+        tri = triangles[best]
+        valence[tri] -= 1
+
+        # The triangle's vertices move to the front, up to three fall off the end.
+        pushed = np.concatenate((tri, cache[(cache != tri[0]) & (cache != tri[1]) & (cache != tri[2])]))
+        cache = pushed[:CACHE_SIZE]
+        evicted = pushed[CACHE_SIZE:]
+        evicted = evicted[evicted >= 0]
+        cached = cache[cache >= 0]
+
+        cache_position[evicted] = -1
+        cache_position[cached] = slots[:len(cached)]
+        touched = np.concatenate((cached, evicted))
+        vertex_score[touched] = position_score[cache_position[touched] + 1] + valence_score[valence[touched]]
+
+        # Every triangle around a touched vertex changed score, including the
+        # ones around evicted vertices that the fallback argmax may still pick.
+        # Only the triangles around the cache are candidates for the next pick.
+        # The CSR rows are gathered at once, the cached rows first.
+        starts = vertex_start[touched]
+        counts = vertex_start[touched + 1] - starts
+        ends = np.cumsum(counts)
+        rescored = vertex_tris[np.repeat(starts - ends + counts, counts) + np.arange(ends[-1])]
+        candidates = rescored[:ends[len(cached) - 1]]
+        candidates = candidates[~emitted[candidates]]
+        rescored = rescored[~emitted[rescored]]
+        tri_score[rescored] = vertex_score[triangles[rescored]].sum(axis=1)
+
+        if len(candidates):
+            best = int(candidates[np.argmax(tri_score[candidates])])
+        elif step + 1 < num_tris:
+            best = int(np.argmax(tri_score))
+
+    return order
+
+
+def acmr(triangles, cache_size=ACMR_CACHE_SIZE):
+    """Average cache miss ratio, transformed vertices per triangle with a FIFO cache."""
+    if not len(triangles):
+        return 0.0
+
+    fifo = [-1] * cache_size
+    cached = set()
+    head = 0
+    misses = 0
+    for vertex in triangles.ravel().tolist():
+        if vertex in cached:
+            continue
+        misses += 1
+        cached.discard(fifo[head])
+        fifo[head] = vertex
+        cached.add(vertex)
+        head = (head + 1) % cache_size
+    return misses / len(triangles)
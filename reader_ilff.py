@@ -89,6 +89,9 @@ class ILFFReader:
     def signatures(self):
         return [item[0] for item in self._chunks]
 
+    def chunks(self):
+        return [ChunkInfo(*item) for item in self._chunks]
+
     def find(self, chunk_signature: bytes) -> bool:
         return chunk_signature in self.signatures()
 
@@ -439,4 +439,54 @@ def parse_caf2(cafs_bytes):
 
 def parse_egde(egde_bytes):
     return np.frombuffer(egde_bytes, DTYPE_EGDE)
+
+def range_triangles(ecaf, face_start, num_face):
+    """Returns the (c, b, a) ordered triangles of one DNER range.
+
+    ECAF indices address the whole XTRV pool, `off_verts` and `num_verts`
+    only describe which part of it a range uses.
+    """
+    faces = ecaf[face_start:face_start + num_face]
+    return np.column_stack((faces['c'], faces['b'], faces['a'])).astype(np.int64)
+
+def face_starts(dner):
+    return (np.cumsum(dner['num_face'], dtype=np.int64) - dner['num_face']).tolist()
+
+def render_triangles(ecaf, dner):
+    """Returns the triangles of every DNER range, see `range_triangles`."""
+    return [range_triangles(ecaf, face_start, num_face)
+            for face_start, num_face in zip(face_starts(dner), dner['num_face'].tolist())]
+
+def lightmap_rects(dner, pmtl):
+    """Works out the lightmap atlas rectangle of every sub-mesh of a type-3 model.
+
+    PMTL holds one (x, y, width, height) pixel rectangle per DNER entry and
+    `_lmap` selects the lightmap page it lives on. The page size is not
+    stored, so it is taken as the smallest power of two enclosing every
+    rectangle placed on that page.
+
+    Returns the (x, y, width, height) rectangles normalised to their page and
+    a {page: (width, height)} dict, or (None, {}) when there are no lightmaps.
+    """
+    if len(pmtl) != len(dner):
+        print(f"PMTL holds {len(pmtl)} rectangles for {len(dner)} DNER entries, lightmap rectangles not applied")
+        return None, {}
+
+    pages = dner['_lmap'].astype(np.int64)
+    rects = np.column_stack((pmtl['_x'], pmtl['_y'], pmtl['_z'], pmtl['_w'])).astype(np.float32)
+    lit = pages >= 0
+    if not lit.any():
+        return None, {}
+
+    extents = np.ones((pages.max() + 1, 2), dtype=np.float32)
+    np.maximum.at(extents, pages[lit], rects[lit, :2] + rects[lit, 2:])
+    extents = 2.0 ** np.ceil(np.log2(extents))
+
+    page_size = extents[np.where(lit, pages, 0)]
+    normalised = np.where(lit[:, None],
+                          np.column_stack((rects[:, :2] / page_size, rects[:, 2:] / page_size)),
+                          np.array((0.0, 0.0, 1.0, 1.0), dtype=np.float32))
+    sizes = {int(page): (int(extents[page, 0]), int(extents[page, 1])) for page in np.unique(pages[lit])}
+
+    return normalised, sizes
     
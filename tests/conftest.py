@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules that do not need Blender are tested as plain modules.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
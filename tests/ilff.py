@@ -0,0 +1,14 @@
+import struct
+
+
+def write_ilff(path, chunks):
+    """Writes (signature, data) chunks as an ILFF file, returns its path."""
+    body = bytearray()
+    for position, (signature, data) in enumerate(chunks):
+        padding = -len(data) % 4
+        skip = 0 if position == len(chunks) - 1 else 16 + len(data) + padding
+        body += struct.pack('=4s3I', signature, len(data), 4, skip) + data
+        if skip:
+            body += bytes(padding)
+    path.write_bytes(struct.pack('=4s3I4s', b'ILFF', 20 + len(body), 4, 0, b'OCEM') + bytes(body))
+    return str(path)
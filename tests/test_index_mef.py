@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+
+from ilff import write_ilff
+from index_mef import open_index, query, update_index
+from struct_mef import DTYPE_HSEM
+
+
+def write_model(path, model_type=0, num_faces=0, extra=()):
+    hsem = np.zeros(1, DTYPE_HSEM)
+    hsem['model_type'], hsem['num_r_faces'] = model_type, num_faces
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return write_ilff(path, [(b'HSEM', hsem.tobytes()), *((signature, bytes(4)) for signature in extra)])
+
+
+def touch_later(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def connection(tmp_path):
+    connection = open_index(str(tmp_path / 'index.sqlite'))
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def game(tmp_path):
+    root = tmp_path / 'game'
+    root.mkdir()
+    (root / 'common.dat').write_text("2\nrock\n1\nstone.tga\n*** comment\nhut\n2\nWood.tga\nstone.tga\n")
+    paths = {
+        'rock': write_model(root / 'rock.mef', 0, 10),
+        'hut': write_model(root / 'sub' / 'hut.mef', 1, 200, [b'XTVM']),
+        'tree': write_model(root / 'tree.mef', 3, 50, [b'PMTL']),
+    }
+    return str(root), paths
+
+
+def test_paths_are_stored_absolute_and_normalised(connection, game, monkeypatch):
+    root, paths = game
+    monkeypatch.chdir(root)
+
+    assert update_index(connection, os.path.join('sub', '..')) == (3, 0)
+    assert query(connection) == sorted(paths.values())
+
+
+def test_unchanged_models_are_not_rescanned(connection, game):
+    root, paths = game
+    update_index(connection, root)
+
+    assert update_index(connection, root) == (0, 0)
+
+    touch_later(paths['rock'])
+    assert update_index(connection, root) == (1, 0)
+
+
+def test_vanished_and_unreadable_models_are_removed(connection, game):
+    root, paths = game
+    update_index(connection, root)
+
+    os.remove(paths['rock'])
+    with open(paths['tree'], 'wb') as file:
+        file.write(b'not a model')
+
+    assert update_index(connection, root) == (0, 2)
+    assert query(connection) == [paths['hut']]
+
+
+def test_other_roots_are_left_alone(connection, game, tmp_path):
+    root, paths = game
+    update_index(connection, root)
+    other = write_model(tmp_path / 'game2' / 'rock.mef')
+
+    assert update_index(connection, str(tmp_path / 'game2')) == (1, 0)
+    assert query(connection) == sorted([*paths.values(), other])
+
+
+@pytest.mark.parametrize('filters, names', [
+    ({}, ['hut', 'rock', 'tree']),
+    ({'model_type': 3}, ['tree']),
+    ({'min_faces': 50}, ['hut', 'tree']),
+    ({'max_faces': 50}, ['rock', 'tree']),
+    ({'min_faces': 20, 'max_faces': 100}, ['tree']),
+    ({'texture': 'STONE.TGA'}, ['hut', 'rock']),
+    ({'texture': 'wood.tga'}, ['hut']),
+    ({'chunk': 'XTVM'}, ['hut']),
+    ({'chunk': 'HSEM', 'model_type': 0}, ['rock']),
+])
+def test_query_filters(connection, game, filters, names):
+    root, paths = game
+    update_index(connection, root)
+
+    assert query(connection, **filters) == sorted(paths[name] for name in names)
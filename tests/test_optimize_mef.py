@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+from struct_mef import DTYPE_DNER_0
+import optimize_mef
+from optimize_mef import _score_tables, split_ranges, compact, weld, cluster, optimize_triangles, acmr
+
+MAX_INDEX = 0xFFFF
+
+
+def strip(num_verts):
+    """A triangle strip using exactly `num_verts` vertices."""
+    first = np.arange(num_verts - 2)
+    return np.column_stack((first, first + 1, first + 2))
+
+
+def grid(size):
+    index = np.arange(size * size).reshape(size, size)
+    a, b, c, d = index[:-1, :-1].ravel(), index[1:, :-1].ravel(), index[:-1, 1:].ravel(), index[1:, 1:].ravel()
+    return np.concatenate((np.column_stack((a, b, c)), np.column_stack((c, b, d))))
+
+
+@pytest.mark.parametrize('num_verts, expected', [
+    (MAX_INDEX, [(0, MAX_INDEX - 2)]),
+    (MAX_INDEX + 1, [(0, MAX_INDEX - 2), (MAX_INDEX - 2, MAX_INDEX - 1)]),
+])
+def test_split_ranges_at_the_16_bit_boundary(num_verts, expected):
+    triangles = strip(num_verts)
+
+    ranges = split_ranges(triangles, MAX_INDEX, MAX_INDEX)
+
+    assert ranges == expected
+    for start, end in ranges:
+        # Every range vertex count must survive the uint16 DNER num_verts.
+        dner = np.zeros(1, DTYPE_DNER_0)
+        dner['num_verts'] = len(np.unique(triangles[start:end]))
+        assert dner['num_verts'][0] == len(np.unique(triangles[start:end]))
+
+
+def test_split_ranges_limits_triangles():
+    triangles = grid(20)
+
+    ranges = split_ranges(triangles, 1000, 100)
+
+    assert ranges[0] == (0, 100)
+    assert ranges[-1][1] == len(triangles)
+    assert all(end - start <= 100 for start, end in ranges)
+
+
+def test_compact_renumbers_in_first_use_order():
+    triangles = np.array([[7, 3, 9], [9, 3, 1]])
+
+    local, vertices = compact(triangles)
+
+    np.testing.assert_array_equal(local, [[0, 1, 2], [2, 1, 3]])
+    np.testing.assert_array_equal(vertices, [7, 3, 9, 1])
+    np.testing.assert_array_equal(vertices[local], triangles)
+
+
+def test_acmr_counts_fifo_misses():
+    assert acmr(np.array([[0, 1, 2], [2, 1, 3]])) == 2.0
+    assert acmr(np.array([[0, 1, 2], [3, 4, 5]]), cache_size=3) == 3.0
+    assert acmr(np.empty((0, 3), dtype=np.int64)) == 0.0
+
+
+def test_optimize_triangles_is_a_permutation_that_lowers_acmr():
+    triangles = grid(30)
+    shuffled = triangles[np.random.default_rng(0).permutation(len(triangles))]
+
+    order = optimize_triangles(shuffled)
+
+    np.testing.assert_array_equal(np.sort(order), np.arange(len(shuffled)))
+    assert acmr(shuffled[order]) < 0.8 < acmr(shuffled)
+
+
+@pytest.mark.parametrize('seed', [0, 5, 6])
+def test_optimize_triangles_picks_the_best_scoring_triangle(monkeypatch, seed):
+    # A small cache evicts vertices that still have triangles left, and the
+    # sparse random triangles often need the whole-mesh fallback.
+    cache_size = 4
+    monkeypatch.setattr(optimize_mef, 'CACHE_SIZE', cache_size)
+    rng = np.random.default_rng(seed)
+    random = np.array([rng.choice(300, 3, replace=False) for _ in range(200)])
+    triangles = np.concatenate((random, grid(6) + 300))
+    triangles = triangles[rng.permutation(len(triangles))]
+
+    order = optimize_triangles(triangles)
+
+    # Replays the picks, scoring every triangle from scratch each step.
+    valence = np.bincount(triangles.ravel())
+    position_score, valence_score = _score_tables(int(valence.max()))
+    emitted = np.zeros(len(triangles), dtype=bool)
+    cache = []
+    for best in order:
+        cache_position = np.full(len(valence), -1)
+        cache_position[cache] = np.arange(len(cache))
+        scores = (position_score[cache_position + 1] + valence_score[valence])[triangles].sum(axis=1)
+        candidates = ~emitted & np.isin(triangles, cache).any(axis=1)
+        if not candidates.any():
+            candidates = ~emitted
+        assert scores[best] == pytest.approx(scores[candidates].max())
+
+        emitted[best] = True
+        np.subtract.at(valence, triangles[best], 1)
+        cache = (list(triangles[best]) + [v for v in cache if v not in triangles[best]])[:cache_size]
+
+
+def test_weld_merges_seam_duplicates():
+    # Two triangles sharing an edge whose vertices are duplicated, as at a UV seam.
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 0, 0.001], [0, 1, 0], [1, 1, 0]], dtype=np.float32)
+    triangles = np.array([[0, 1, 2], [3, 5, 4]])
+
+    welded_positions, welded, kept = weld(positions, triangles, 0.01)
+
+    assert len(welded_positions) == 4
+    assert kept.all()
+    np.testing.assert_allclose(welded_positions[welded], positions[triangles], atol=0.01)
+    assert welded[0, 1] == welded[1, 0] and welded[0, 2] == welded[1, 2]
+
+
+def test_weld_drops_collapsed_triangles():
+    positions = np.array([[0, 0, 0], [0.001, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=np.float32)
+    triangles = np.array([[0, 1, 2], [0, 2, 3]])
+
+    _, _, kept = weld(positions, triangles, 0.01)
+
+    np.testing.assert_array_equal(kept, [False, True])
+
+
+def test_cluster_simplifies_a_grid():
+    size = 17
+    index = np.arange(size * size)
+    positions = np.column_stack((index % size, index // size, np.zeros(size * size))).astype(np.float32)
+    triangles = grid(size)
+
+    centers, clustered, kept = cluster(positions, triangles, 4.0)
+
+    assert len(centers) == 25
+    assert 0 < kept.sum() < len(triangles) // 4
+    # Kept triangles are neither degenerate nor repeated.
+    kept_triangles = np.sort(clustered[kept], axis=1)
+    assert (kept_triangles[:, 0] != kept_triangles[:, 1]).all() and (kept_triangles[:, 1] != kept_triangles[:, 2]).all()
+    assert len(np.unique(kept_triangles, axis=0)) == len(kept_triangles)
+
+
+def test_cluster_centers_are_cell_means():
+    positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [9, 0, 0], [9, 1, 0]], dtype=np.float32)
+    triangles = np.array([[0, 1, 3], [2, 4, 3]])
+
+    centers, clustered, kept = cluster(positions, triangles, 5.0)
+
+    np.testing.assert_allclose(centers, [[1 / 3, 1 / 3, 0], [9, 0.5, 0]])
+    assert not kept.any()
@@ -0,0 +1,64 @@
+import numpy as np
+
+from struct_mef import DTYPE_DNER_0, DTYPE_DNER_3, DTYPE_ECAF, DTYPE_PMTL, lightmap_rects, render_triangles
+
+
+def make_lightmapped(pages, rects):
+    dner = np.zeros(len(pages), DTYPE_DNER_3)
+    dner['_lmap'] = pages
+    pmtl = np.zeros(len(rects), DTYPE_PMTL)
+    pmtl['_x'], pmtl['_y'], pmtl['_z'], pmtl['_w'] = np.array(rects).T
+    return dner, pmtl
+
+
+def test_lightmap_rects_normalises_to_power_of_two_pages():
+    dner, pmtl = make_lightmapped([0, 0, 1], [(0, 0, 64, 32), (64, 0, 100, 100), (0, 0, 16, 16)])
+
+    rects, sizes = lightmap_rects(dner, pmtl)
+
+    assert sizes == {0: (256, 128), 1: (16, 16)}
+    np.testing.assert_allclose(rects[0], (0.0, 0.0, 0.25, 0.25))
+    np.testing.assert_allclose(rects[1], (0.25, 0.0, 100 / 256, 100 / 128))
+    np.testing.assert_allclose(rects[2], (0.0, 0.0, 1.0, 1.0))
+
+
+def test_lightmap_rects_leaves_unlit_sub_meshes_unmapped():
+    dner, pmtl = make_lightmapped([-1, 0], [(8, 8, 8, 8), (0, 0, 32, 32)])
+
+    rects, sizes = lightmap_rects(dner, pmtl)
+
+    assert sizes == {0: (32, 32)}
+    np.testing.assert_allclose(rects[0], (0.0, 0.0, 1.0, 1.0))
+
+
+def test_lightmap_rects_without_lit_sub_meshes():
+    dner, pmtl = make_lightmapped([-1], [(0, 0, 8, 8)])
+
+    assert lightmap_rects(dner, pmtl) == (None, {})
+
+
+def test_lightmap_rects_warns_when_pmtl_does_not_match_dner(capsys):
+    dner, pmtl = make_lightmapped([0, 0], [(0, 0, 8, 8)])
+
+    assert lightmap_rects(dner, pmtl) == (None, {})
+    assert "PMTL holds 1 rectangles for 2 DNER entries" in capsys.readouterr().out
+
+
+def make_ranges():
+    ecaf = np.zeros(2, DTYPE_ECAF)
+    ecaf['a'], ecaf['b'], ecaf['c'] = [0, 3], [1, 4], [2, 5]
+    dner = np.zeros(2, DTYPE_DNER_0)
+    dner['num_face'] = [1, 1]
+    dner['off_verts'] = [0, 3]
+    dner['num_verts'] = [3, 5]
+    return ecaf, dner
+
+
+def test_render_triangles_keeps_pool_wide_indices():
+    ecaf, dner = make_ranges()
+
+    triangles = render_triangles(ecaf, dner)
+
+    # Indices are never rebased by off_verts.
+    np.testing.assert_array_equal(triangles[0], [[2, 1, 0]])
+    np.testing.assert_array_equal(triangles[1], [[5, 4, 3]])
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from ilff import write_ilff
+from struct_mef import *
+from validate_mef import validate, validate_corpus
+
+
+def rigid_chunks(**changes):
+    """Two ranges of one triangle each over a pool of six vertices."""
+    ecaf = np.zeros(2, DTYPE_ECAF)
+    ecaf['a'], ecaf['b'], ecaf['c'] = [0, 3], [1, 4], [2, 5]
+    dner = np.zeros(2, DTYPE_DNER_0)
+    dner['num_face'] = 1
+    dner['off_verts'] = [0, 3]
+    dner['num_verts'] = 3
+    xtrv = np.zeros(6, DTYPE_XTRV_0)
+    d3dr = np.zeros(1, DTYPE_D3DR_0)
+    d3dr['num_face'], d3dr['num_mesh'], d3dr['num_verts'] = 2, 2, 6
+    hsem = np.zeros(1, DTYPE_HSEM)
+    hsem['num_r_faces'], hsem['num_r_verts'] = 2, 6
+
+    chunks = {b'HSEM': hsem, b'D3DR': d3dr, b'DNER': dner, b'ECAF': ecaf, b'XTRV': xtrv}
+    for name, change in changes.items():
+        change(chunks[name.encode()])
+    return [(signature, array.tobytes()) for signature, array in chunks.items()]
+
+
+def test_valid_rigid_model(tmp_path):
+    assert validate(write_ilff(tmp_path / 'a.mef', rigid_chunks())) == []
+
+
+def test_truncated_file(tmp_path):
+    path = tmp_path / 'a.mef'
+    write_ilff(path, rigid_chunks())
+    path.write_bytes(path.read_bytes()[:-4])
+
+    assert validate(str(path)) == ["File size mismatch"]
+
+
+def test_chunk_size_not_a_record_multiple(tmp_path):
+    chunks = [(signature, data + bytes(4) if signature == b'XTRV' else data) for signature, data in rigid_chunks()]
+
+    assert validate(write_ilff(tmp_path / 'a.mef', chunks)) == ["XTRV size 196 is not a multiple of its 32 byte records"]
+
+
+@pytest.mark.parametrize('extra', [4, DTYPE_HSEM.itemsize])
+def test_hsem_is_not_one_record(tmp_path, extra):
+    chunks = [(signature, data + bytes(extra) if signature == b'HSEM' else data) for signature, data in rigid_chunks()]
+
+    errors = validate(write_ilff(tmp_path / 'a.mef', chunks))
+
+    assert errors == [f"HSEM holds {DTYPE_HSEM.itemsize + extra} bytes, expected {DTYPE_HSEM.itemsize}"]
+
+
+def test_header_count_mismatch(tmp_path):
+    def change(hsem):
+        hsem['num_r_verts'] = 7
+
+    assert validate(write_ilff(tmp_path / 'a.mef', rigid_chunks(HSEM=change))) == ["HSEM num_r_verts is 7, found 6"]
+
+
+def test_ecaf_index_out_of_pool(tmp_path):
+    def change(ecaf):
+        ecaf['c'][1] = 6
+
+    errors = validate(write_ilff(tmp_path / 'a.mef', rigid_chunks(ECAF=change)))
+
+    assert errors == ["ECAF index 6 out of range, XTRV has 6 records"]
+
+
+def test_dner_range_overrun(tmp_path):
+    def change(dner):
+        dner['num_verts'][1] = 4
+
+    errors = validate(write_ilff(tmp_path / 'a.mef', rigid_chunks(DNER=change)))
+
+    assert errors == ["DNER vertex range 1 ends at 7, XTRV has 6 records"]
+
+
+def test_shadow_edge_out_of_range(tmp_path):
+    sems = np.zeros(1, DTYPE_SEMS)
+    sems['num_sfaces'], sems['num_sverts'], sems['num_sedges'] = 1, 3, 3
+    cafs = np.zeros(1, DTYPE_CAFS)
+    cafs['a'], cafs['b'], cafs['c'] = 0, 1, 2
+    egde = np.array([(0, 1), (1, 2), (2, 5)], DTYPE_EGDE)
+    chunks = [(b'SEMS', sems.tobytes()), (b'XTVS', np.zeros(3, DTYPE_XTVS).tobytes()),
+              (b'CAFS', cafs.tobytes()), (b'EGDE', egde.tobytes())]
+
+    assert validate(write_ilff(tmp_path / 's.mef', chunks)) == ["EGDE index 5 out of range, XTVS has 3 records"]
+
+
+def test_validate_corpus_keeps_file_order(tmp_path):
+    def change(hsem):
+        hsem['num_r_faces'] = 3
+
+    paths = [write_ilff(tmp_path / f'{index}.mef', rigid_chunks(HSEM=change) if index == 2 else rigid_chunks())
+             for index in range(5)]
+
+    results = list(validate_corpus(paths, workers=2))
+
+    assert [path for path, _ in results] == paths
+    assert [bool(errors) for _, errors in results] == [False, False, True, False, False]
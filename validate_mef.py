@@ -0,0 +1,202 @@
+import os
+import sys
+import builtins
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Also run as a plain script, outside Blender and the add-on package.
+if __package__:
+    from . import reader_ilff
+    from .struct_mef import *
+else:
+    import reader_ilff
+    from struct_mef import *
+
+# Record layout of every chunk the importer reads, per model_type where it differs.
+CHUNK_DTYPES = {
+    b'HSEM': DTYPE_HSEM,
+    b'ECAF': DTYPE_ECAF,
+    b'ECFC': DTYPE_ECFC,
+    b'XTVM': DTYPE_XTVM,
+    b'PMTL': DTYPE_PMTL,
+    b'SEMS': DTYPE_SEMS,
+    b'XTVS': DTYPE_XTVS,
+    b'CAFS': DTYPE_CAFS,
+    b'EGDE': DTYPE_EGDE,
+}
+MODEL_CHUNK_DTYPES = {
+    0: {b'D3DR': DTYPE_D3DR_0, b'DNER': DTYPE_DNER_0, b'XTRV': DTYPE_XTRV_0, b'XTVC': DTYPE_XTVC_0},
+    1: {b'D3DR': DTYPE_D3DR_1, b'DNER': DTYPE_DNER_0, b'XTRV': DTYPE_XTRV_1, b'XTVC': DTYPE_XTVC_1},
+    3: {b'D3DR': DTYPE_D3DR_3, b'DNER': DTYPE_DNER_3, b'XTRV': DTYPE_XTRV_3, b'XTVC': DTYPE_XTVC_3},
+}
+
+
+def check_count(errors, what, expected, found):
+    if expected != found:
+        errors.append(f"{what} is {expected}, found {found}")
+
+
+def check_indices(errors, signature, indices, limit, target):
+    """Every index must address one of the `limit` records of `target`."""
+    if indices.size and indices.max() >= limit:
+        errors.append(f"{signature} index {indices.max()} out of range, {target} has {limit} records")
+
+
+def check_ranges(errors, signature, offsets, counts, limit, target):
+    """Every (offset, count) range must stay within the `limit` records of `target`."""
+    ends = offsets.astype(np.int64) + counts
+    overruns = np.flatnonzero(ends > limit)
+    if len(overruns):
+        errors.append(f"{signature} range {overruns[0]} ends at {ends[overruns[0]]}, {target} has {limit} records")
+
+
+def validate_render(errors, hsem, records, read):
+    model_type = int(hsem['model_type'][0])
+    for signature in (b'D3DR', b'DNER', b'ECAF', b'XTRV'):
+        if signature not in records:
+            errors.append(f"Missing {signature.decode()} chunk")
+    if errors:
+        return
+
+    num_faces, num_verts = records[b'ECAF'], records[b'XTRV']
+    check_count(errors, "HSEM num_r_faces", hsem['num_r_faces'][0], num_faces)
+    check_count(errors, "HSEM num_r_verts", hsem['num_r_verts'][0], num_verts)
+    check_count(errors, "HSEM sum_c_faces", hsem['sum_c_faces'][0], records.get(b'ECFC', 0))
+    check_count(errors, "HSEM sum_c_verts", hsem['sum_c_verts'][0], records.get(b'XTVC', 0))
+    check_count(errors, "HSEM num_mverts", hsem['num_mverts'][0], records.get(b'XTVM', 0))
+
+    d3dr = np.frombuffer(read(b'D3DR'), MODEL_CHUNK_DTYPES[model_type][b'D3DR'])
+    dner = np.frombuffer(read(b'DNER'), MODEL_CHUNK_DTYPES[model_type][b'DNER'])
+    if len(d3dr):
+        check_count(errors, "D3DR num_mesh", d3dr['num_mesh'][0], len(dner))
+        check_count(errors, "D3DR num_face", d3dr['num_face'][0], num_faces)
+        check_count(errors, "D3DR num_verts", d3dr['num_verts'][0], num_verts)
+
+    # Ranges follow each other in ECAF, see render_triangles.
+    starts = np.array(face_starts(dner), dtype=np.int64)
+    check_ranges(errors, "DNER face", starts, dner['num_face'], num_faces, "ECAF")
+    check_ranges(errors, "DNER vertex", dner['off_verts'], dner['num_verts'], num_verts, "XTRV")
+    if errors:
+        return
+
+    ecaf = parse_ecaf(read(b'ECAF'))
+    # Only the faces the ranges cover are drawn.
+    corners = ecaf.view(np.uint16)[:3 * int(starts[-1] + dner['num_face'][-1]) if len(dner) else 0]
+    check_indices(errors, "ECAF", corners, num_verts, "XTRV")
+
+    if b'ECFC' in records:
+        ecfc = parse_ecfc(read(b'ECFC'))
+        check_indices(errors, "ECFC", np.column_stack((ecfc['a'], ecfc['b'], ecfc['c'])), records.get(b'XTVC', 0), "XTVC")
+
+
+def validate_shadow(errors, records, read):
+    for signature in (b'SEMS', b'XTVS', b'CAFS', b'EGDE'):
+        if signature not in records:
+            errors.append(f"Missing {signature.decode()} chunk")
+    if errors:
+        return
+
+    num_faces, num_verts, num_edges = records[b'CAFS'], records[b'XTVS'], records[b'EGDE']
+    sems = parse_sems(read(b'SEMS'))
+    check_ranges(errors, "SEMS face", sems['offset_sfaces'], sems['num_sfaces'], num_faces, "CAFS")
+    check_ranges(errors, "SEMS vertex", sems['offset_sverts'], sems['num_sverts'], num_verts, "XTVS")
+    check_ranges(errors, "SEMS edge", sems['offset_sedges'], sems['num_sedges'], num_edges, "EGDE")
+
+    cafs = parse_cafs(read(b'CAFS'))
+    check_indices(errors, "CAFS", np.column_stack((cafs['a'], cafs['b'], cafs['c'])), num_verts, "XTVS")
+    egde = parse_egde(read(b'EGDE'))
+    check_indices(errors, "EGDE", egde.view(np.uint32), num_verts, "XTVS")
+
+
+def validate(filepath):
+    """Checks the structure of a MEF without building anything, returns a list of errors.
+
+    Chunk sizes are checked against their record layouts, header counts
+    against the chunk record counts, and every index and range against the
+    chunk it addresses. Vertex chunks are never read, their sizes are enough.
+    """
+    try:
+        reader = reader_ilff.ILFFReader(builtins.open(filepath, 'rb'))
+    except (OSError, ValueError) as e:
+        return [str(e)]
+
+    with reader:
+        chunks = {}
+        for info in reader.chunks():
+            chunks.setdefault(info.signature, info)
+
+        model_type = None
+        if b'HSEM' in chunks:
+            # Checked before parsing, frombuffer raises on a partial record.
+            if chunks[b'HSEM'].size != DTYPE_HSEM.itemsize:
+                return [f"HSEM holds {chunks[b'HSEM'].size} bytes, expected {DTYPE_HSEM.itemsize}"]
+            hsem = parse_hsem(reader.read(b'HSEM'))
+            model_type = int(hsem['model_type'][0])
+            if model_type not in MODEL_CHUNK_DTYPES:
+                return [f"Unsupported model type {model_type}"]
+        elif b'SEMS' not in chunks:
+            return ["Neither a HSEM nor a SEMS chunk, not a model"]
+
+        errors = []
+        records = {}
+        dtypes = {**CHUNK_DTYPES, **MODEL_CHUNK_DTYPES.get(model_type, {})}
+        for signature, info in chunks.items():
+            dtype = dtypes.get(signature)
+            if dtype is None:
+                continue
+            if info.size % dtype.itemsize:
+                errors.append(f"{signature.decode()} size {info.size} is not a multiple of its {dtype.itemsize} byte records")
+            records[signature] = info.size // dtype.itemsize
+        if errors:
+            return errors
+
+        if model_type is not None:
+            validate_render(errors, hsem, records, reader.read)
+        else:
+            validate_shadow(errors, records, reader.read)
+    return errors
+
+
+def find_models(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith('.mef'):
+                yield os.path.join(dirpath, filename)
+
+
+def validate_corpus(filepaths, workers=None):
+    """Validates many files over a process pool, yields (filepath, errors) in order."""
+    filepaths = list(filepaths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from zip(filepaths, executor.map(validate, filepaths, chunksize=16))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the structure of MEF models.")
+    parser.add_argument('paths', nargs='+', help="MEF files or directories to search for them")
+    parser.add_argument('--workers', type=int, help="Number of worker processes, defaults to the CPU count")
+    parser.add_argument('--quiet', action='store_true', help="Only list invalid files")
+    args = parser.parse_args()
+
+    filepaths = []
+    for path in args.paths:
+        filepaths.extend(find_models(path) if os.path.isdir(path) else [path])
+
+    invalid = 0
+    for filepath, errors in validate_corpus(filepaths, args.workers):
+        if errors:
+            invalid += 1
+            print(f"{filepath}: INVALID")
+            for error in errors:
+                print(f"    {error}")
+        elif not args.quiet:
+            print(f"{filepath}: ok")
+
+    print(f"Checked {len(filepaths)}, invalid {invalid}")
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
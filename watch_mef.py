@@ -0,0 +1,149 @@
+import bpy
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from . import reader_ilff
+from . import import_mef
+
+POLL_INTERVAL = 1.0
+
+_executor = None
+_mtimes = {}
+_pending = {}
+
+
+def import_options(mesh_object):
+    """Returns the import options stored on an imported render object."""
+    return {option: mesh_object[f'mef_{option}'] for option in import_mef.PROXY_OPTIONS if f'mef_{option}' in mesh_object}
+
+
+def decode(filepath, options):
+    """Reads and parses a model without touching Blender data, safe to run off the main thread."""
+    with reader_ilff.open_ilff(filepath) as reader:
+        rigid = import_mef.Rigid(reader, os.path.splitext(os.path.basename(filepath))[0], **options)
+        rigid.load_bytes()
+        rigid.parse_bytes()
+    return rigid
+
+
+def watched_objects():
+    """Groups the imported render objects by the file they came from."""
+    groups = {}
+    for obj in bpy.data.objects:
+        if obj.type == 'MESH' and 'mef_filepath' in obj and 'mef_submesh' in obj:
+            groups.setdefault(obj['mef_filepath'], []).append(obj)
+    return groups
+
+
+def reload_lods(rigid, mesh_object, base_mesh, object_index, vertex_positions, object_triangle_indices, vertex_indices):
+    """Replaces the generated LODs of a reloaded sub-mesh, keeping the level it shows."""
+    lods = list(mesh_object['mef_lods'])
+    level = lods.index(mesh_object.data.name) if mesh_object.data.name in lods else 0
+
+    mesh_object.data = base_mesh
+    for name in lods[1:]:
+        mesh = bpy.data.meshes.get(name)
+        if mesh is not None:
+            bpy.data.meshes.remove(mesh)
+
+    new_lods = rigid.create_lods(base_mesh.name, object_index, vertex_positions, object_triangle_indices, vertex_indices)
+    mesh_object['mef_lods'] = [base_mesh.name] + [mesh.name for mesh in new_lods]
+    if new_lods:
+        mesh_object.data = new_lods[min(level, len(new_lods)) - 1] if level else base_mesh
+
+
+def reload_object(rigid, mesh_object):
+    """Updates an imported sub-mesh in place, rebuilding it only if its topology changed.
+
+    The geometry is built as on import, with the options stored on the object,
+    and its LODs are generated again.
+    """
+    object_index = mesh_object['mef_submesh']
+    if object_index >= len(rigid.dner):
+        return
+
+    vertex_positions, vertex_normals, object_triangle_indices, vertex_indices = rigid.submesh_arrays(object_index)
+
+    # The base mesh is updated even while a generated LOD is shown.
+    lods = mesh_object.get('mef_lods')
+    mesh = bpy.data.meshes.get(lods[0]) if lods else mesh_object.data
+    if mesh is None:
+        mesh = mesh_object.data
+
+    loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_vertex_indices)
+
+    # Welding moves and merges vertices, a welded mesh is always rebuilt.
+    if (rigid.weld_distance <= 0.0 and len(mesh.vertices) == len(vertex_positions)
+            and np.array_equal(loop_vertex_indices, object_triangle_indices.ravel())):
+        mesh.vertices.foreach_set('co', np.ascontiguousarray(vertex_positions, dtype=np.float32).ravel())
+        if vertex_normals is not None:
+            mesh.normals_split_custom_set_from_vertices(vertex_normals.tolist())
+        rigid.apply_uv_maps(mesh, object_index, loop_vertex_indices, vertex_indices)
+        mesh.update()
+    else:
+        mesh.clear_geometry()
+        rigid.build_mesh(mesh, object_index, vertex_positions, vertex_normals, object_triangle_indices, vertex_indices)
+
+    if lods and rigid.lod_levels > 0:
+        reload_lods(rigid, mesh_object, mesh, object_index, vertex_positions, object_triangle_indices, vertex_indices)
+
+
+def poll():
+    """Timer callback, queues changed files for decoding and applies finished ones."""
+    groups = watched_objects()
+
+    for filepath in groups:
+        try:
+            mtime = os.path.getmtime(filepath)
+        except OSError:
+            continue
+
+        if _mtimes.setdefault(filepath, mtime) != mtime and filepath not in _pending:
+            _mtimes[filepath] = mtime
+            _pending[filepath] = _executor.submit(decode, filepath, import_options(groups[filepath][0]))
+
+    for filepath, future in list(_pending.items()):
+        if not future.done():
+            continue
+        del _pending[filepath]
+
+        # An exception escaping the timer callback unregisters it for good,
+        # a bad or half-written file must not stop the watcher.
+        try:
+            rigid = future.result()
+            for mesh_object in groups.get(filepath, []):
+                reload_object(rigid, mesh_object)
+        except Exception as e:
+            print(f"Hot reload of {filepath} failed: {type(e).__name__}: {e}")
+            continue
+        print(f"Reloaded {filepath}")
+
+    return POLL_INTERVAL
+
+
+def is_running():
+    return bpy.app.timers.is_registered(poll)
+
+
+def start():
+    global _executor
+    if is_running():
+        return
+
+    _executor = ThreadPoolExecutor(max_workers=1)
+    _mtimes.clear()
+    _pending.clear()
+    bpy.app.timers.register(poll, first_interval=POLL_INTERVAL, persistent=True)
+
+
+def stop():
+    global _executor
+    if is_running():
+        bpy.app.timers.unregister(poll)
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _pending.clear()
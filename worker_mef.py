@@ -0,0 +1,182 @@
+"""Decodes a MEF in a separate process and hands the arrays back through shared memory.
+
+Run as a script by `Job`, it prints one JSON line describing the arrays it
+placed in a shared memory block, then waits for the parent to report that
+it has copied them before releasing the block. Only that JSON line crosses
+the pipe, the array data itself is never pickled or copied.
+"""
+import os
+import sys
+import json
+import contextlib
+import threading
+import subprocess
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+addon_dir = os.path.dirname(__file__)
+
+# Imported by the add-on package for Job, run as a plain script in the worker.
+if __package__:
+    from . import reader_ilff
+    from .struct_mef import *
+else:
+    import reader_ilff
+    from struct_mef import *
+
+
+def decode(filepath):
+    """Decodes the render data of a rigid model into flat, loop ordered arrays."""
+    with reader_ilff.open_ilff(filepath) as reader:
+        if not reader.find(b'HSEM'):
+            return None
+
+        hsem = parse_hsem(reader.read(b'HSEM'))
+        model_type = hsem['model_type'][0]
+        dner = parse_dner(reader.read(b'DNER'), model_type)
+        ecaf = parse_ecaf(reader.read(b'ECAF'))
+        xtrv = parse_xtrv(reader.read(b'XTRV'), model_type)
+        xtvm_bytes = reader.read(b'XTVM')
+        pmtl_bytes = reader.read(b'PMTL')
+
+    if dner is None or xtrv is None:
+        raise ValueError(f"Unsupported model type {model_type}")
+
+    num_face = dner['num_face'].astype(np.int64)
+    loops = np.concatenate(render_triangles(ecaf, dner)).astype(np.int32).ravel()
+    xtvm = parse_xtvm(xtvm_bytes or b'')
+    arrays = {
+        'positions': np.column_stack((xtrv['px'], xtrv['py'], xtrv['pz'])),
+        'loops': loops,
+        'num_face': num_face,
+        'uv': 1.0 - np.column_stack((xtrv['u'], xtrv['v']))[loops],
+        'magic': np.column_stack((xtvm['px'], xtvm['py'], xtvm['pz'])),
+    }
+
+    if 'nx' in xtrv.dtype.names:
+        arrays['normals'] = np.column_stack((xtrv['nx'], xtrv['ny'], xtrv['nz']))
+
+    if 'u1' in xtrv.dtype.names:
+        uv1 = np.column_stack((xtrv['u1'], xtrv['v1']))[loops]
+
+        rects, sizes = (None, {})
+        if model_type == 3 and pmtl_bytes:
+            rects, sizes = lightmap_rects(dner, parse_pmtl(pmtl_bytes))
+
+        if rects is not None:
+            loop_rects = np.repeat(rects, num_face * 3, axis=0)[:len(uv1)]
+            uv1 = loop_rects[:, :2] + uv1 * loop_rects[:, 2:]
+            arrays['lightmap_pages'] = dner['_lmap'].astype(np.int32)
+            arrays['lightmap_sizes'] = np.array([(page, *sizes[page]) for page in sorted(sizes)], dtype=np.int32)
+
+        arrays['uv1'] = 1.0 - uv1
+
+    return arrays
+
+
+def share(arrays):
+    """Copies the arrays into one shared memory block, returns it with its layout."""
+    layout = []
+    offset = 0
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[key] = array
+        layout.append((key, array.dtype.str, array.shape, offset))
+        offset += -(-array.nbytes // 16) * 16
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for key, dtype, shape, start in layout:
+        np.ndarray(shape, dtype, buffer=shm.buf, offset=start)[...] = arrays[key]
+
+    return shm, layout
+
+
+def main():
+    try:
+        # stdout is reserved for the JSON hand-off line.
+        with contextlib.redirect_stdout(sys.stderr):
+            arrays = decode(sys.argv[1])
+    except (OSError, ValueError) as e:
+        print(json.dumps({'error': str(e)}), flush=True)
+        return 1
+
+    if arrays is None:
+        print(json.dumps({'fallback': True}), flush=True)
+        return 0
+
+    shm, layout = share(arrays)
+    del arrays
+
+    print(json.dumps({'name': shm.name, 'layout': layout}), flush=True)
+
+    # Keep the block alive until the parent is done with it, it disappears
+    # with its last handle on Windows.
+    sys.stdin.readline()
+
+    shm.close()
+    shm.unlink()
+    return 0
+
+
+class Job:
+    """A MEF being decoded by a worker process."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.message = None
+        self._shm = None
+        self._process = subprocess.Popen([sys.executable, os.path.join(addon_dir, 'worker_mef.py'), filepath],
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        line = self._process.stdout.readline()
+        try:
+            self.message = json.loads(line)
+        except ValueError:
+            self.message = {'error': f"Worker exited with {self._process.wait()}"}
+
+    def ready(self):
+        return self.message is not None
+
+    def arrays(self):
+        """Maps the worker's arrays without copying, None if the file needs the regular importer.
+
+        The views are only valid until `release` is called.
+        """
+        if 'error' in self.message:
+            raise ValueError(self.message['error'])
+        if self.message.get('fallback'):
+            return None
+
+        self._shm = shared_memory.SharedMemory(name=self.message['name'])
+        if os.name == 'posix':
+            # The worker owns and unlinks the block, do not let our tracker do it again.
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+
+        return {key: np.ndarray(shape, dtype, buffer=self._shm.buf, offset=offset)
+                for key, dtype, shape, offset in self.message['layout']}
+
+    def release(self):
+        """Unmaps the arrays and lets the worker free the block and exit."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+        if self._process.poll() is None:
+            try:
+                self._process.stdin.write('\n')
+                self._process.stdin.close()
+            except OSError:
+                pass
+            self._process.wait()
+
+    def cancel(self):
+        self._process.kill()
+        self._process.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())